@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Con un servidor de varios hilos dos lotes pueden llegar a la vez: un solo pool por proceso
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _executor
+
+
+def discard_executor(executor):
+    # Un pool roto (un proceso murio, por ejemplo por falta de memoria) no acepta mas trabajos:
+    # se descarta y el siguiente get_executor arma uno nuevo
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit(fn, *args):
+    # Devuelve (future, pool). Si el pool ya estaba roto se reemplaza y se reintenta una vez
+    executor = get_executor()
+    try:
+        return executor.submit(fn, *args), executor
+    except BrokenProcessPool:
+        discard_executor(executor)
+        executor = get_executor()
+        return executor.submit(fn, *args), executor
+
+
+class ZipChunks:
+    # Destino de escritura sin seek para zipfile: acumula lo escrito hasta que se entrega al cliente
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(render, items, window=None):
+    # Genera el ZIP por partes a medida que terminan los libros. Como mucho `window` trabajos
+    # en vuelo, así que la memoria queda acotada aunque el lote sea grande. Los xlsx ya van
+    # comprimidos, por eso se guardan sin volver a comprimir.
+    # items: lista de (nombre, argumentos para render); render devuelve (bytes, error).
+    # Si un proceso muere, los libros que estaban en ese pool se reportan como error y el resto
+    # del lote sigue en un pool nuevo
+    window = window or 2 * BATCH_WORKERS
+    out = ZipChunks()
+    errors = []
+    with zipfile.ZipFile(out, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        pending = {}
+        queue = iter(items)
+        while True:
+            while len(pending) < window:
+                item = next(queue, None)
+                if item is None:
+                    break
+                name, args = item
+                try:
+                    future, executor = submit(render, *args)
+                except BrokenProcessPool as e:
+                    errors.append({'name': name, 'error': f"Render error: {e}"})
+                    continue
+                pending[future] = name, executor
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, executor = pending.pop(future)
+                try:
+                    data, error = future.result()
+                except BrokenProcessPool as e:
+                    discard_executor(executor)
+                    data, error = None, f"Render error: {e}"
+                except Exception as e:
+                    data, error = None, f"Render error: {e}"
+                if error:
+                    errors.append({'name': name, 'error': error})
+                else:
+                    archive.writestr(name, data)
+            chunk = out.drain()
+            if chunk:
+                yield chunk
+        archive.writestr('errores.json', json.dumps(errors, ensure_ascii=False, indent=2))
+    yield out.drain()
@@ -0,0 +1,311 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Casos por defecto: (tramos, aeronaves, dias). Cubren de 10 a 100k tramos, de 7 a 500 aeronaves y de 1 a 31 dias.
+CASES = [
+    (10, 7, 1),
+    (1000, 7, 7),
+    (1000, 50, 3),
+    (10000, 100, 7),
+    (10000, 500, 1),
+    (100000, 500, 31),
+]
+QUICK_CASES = [(10, 7, 1), (1000, 7, 7), (1000, 50, 3)]
+# Misma densidad de vuelos (7 aeronaves, ~70 tramos por dia) con el doble de tramos en cada caso:
+# con un costo lineal los ms por tramo se mantienen parejos
+SCALING_CASES = [(500, 7, 4), (1000, 7, 7), (2000, 7, 14), (4000, 7, 28)]
+PIPELINES = ['xlsx', 'xlsx_stream', 'pdf']
+# Rutas de mainMAX con cada backend de writers.py; se piden con --pipelines max_openpyxl,max_stream
+MAX_PIPELINES = {'max_openpyxl': 'openpyxl', 'max_stream': 'stream'}
+REAL_TAILS = ['N330QT', 'N331QT', 'N332QT', 'N334QT', 'N335QT', 'N336QT', 'N337QT']
+AIRPORTS = ['BOG', 'MDE', 'MIA', 'UIO', 'PTY', 'LIM', 'SCL', 'GRU']
+CASE_TIMEOUT = int(os.environ.get('BENCHMARK_TIMEOUT', 900))
+
+
+def synthetic_tails(count):
+    return REAL_TAILS[:count] + [f'N{1000 + i}QT' for i in range(max(0, count - len(REAL_TAILS)))]
+
+
+def synthetic_schedule(legs, tails, days, seed=0):
+    # Tabla determinista con las mismas columnas que la grilla de Handsontable. Cada aeronave vuela
+    # tramos sin solape repartidos de forma pareja en el horizonte.
+    r = random.Random(seed)
+    regs = synthetic_tails(tails)
+    base = datetime.datetime(2024, 10, 1)
+    horizon = days * 24 * 60
+    per_tail = [legs // tails + (1 if t < legs % tails else 0) for t in range(tails)]
+    rows = []
+    for t, reg in enumerate(regs):
+        if not per_tail[t]:
+            continue
+        slot = horizon / per_tail[t]
+        for k in range(per_tail[t]):
+            duration = r.randrange(30, max(31, min(300, int(slot * 0.7))))
+            offset = r.randrange(0, max(1, int(slot) - duration))
+            std = base + datetime.timedelta(minutes=int(k * slot) + offset)
+            sta = std + datetime.timedelta(minutes=duration)
+            origin, destination = r.sample(AIRPORTS, 2)
+            rows.append({
+                'Flight': f'QT{r.randrange(1000, 9999)}',
+                'STD': std.strftime('%d%b %H:%M'),
+                'STA': sta.strftime('%d%b %H:%M'),
+                'From': origin,
+                'To': destination,
+                'Reg.': reg,
+                'Crew': f'{r.choice("ABCDEFGH")}{r.choice("ABCDEFGH")}/{r.choice("IJKLMNOP")}{r.choice("IJKLMNOP")}',
+                'Notas': r.choice(['', 'CHARTER', 'FERRY', '']),
+                'Tripadi': r.choice(['', '', 'TR1']),
+            })
+    r.shuffle(rows)
+    return rows
+
+
+def write_fleet(tails, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'first_row': 6, 'tails': [{'reg': reg, 'rows': 9} for reg in synthetic_tails(tails)]}, f)
+
+
+def run_max_pipeline(backend, payload):
+    # Igual que la ruta / de mainMAX (horizonte de HORIZON_MODE) con el backend indicado
+    import io
+
+    import pandas as pd
+    import mainMAX
+
+    stages = {}
+    t0 = time.perf_counter()
+    df = pd.read_json(io.StringIO(payload))
+    stages['read_json'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df, error = mainMAX.parse_schedule(df)
+    stages['parse'] = time.perf_counter() - t0
+    if error:
+        raise ValueError(error)
+
+    t0 = time.perf_counter()
+    if mainMAX.HORIZON_MODE == 'daily' and mainMAX.operating_days(df).nunique() > 1:
+        writer, conflicts = mainMAX.write_daily(df, 'benchmark', backend)
+    else:
+        writer, model = mainMAX.write_sheet(df, 'benchmark', backend)
+        conflicts = model.conflicts
+    mainMAX.write_conflicts(writer, conflicts)
+    stages['write'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    buf = io.BytesIO()
+    writer.save(buf)
+    stages['save'] = time.perf_counter() - t0
+    return stages, len(buf.getvalue())
+
+
+def run_pipeline(pipeline, payload):
+    if pipeline in MAX_PIPELINES:
+        return run_max_pipeline(MAX_PIPELINES[pipeline], payload)
+    # Ejecuta una vez la ruta de /render para un formato y devuelve (tiempos por etapa, bytes de salida)
+    from fleet import FLEET
+    from gantt_pdf import render_gantt
+    from main import prepare_schedule, read_table, save_workbook, spool_workbook, write_schedule, write_schedule_stream
+    from schedule_model import ScheduleModel
+
+    stages = {}
+    t0 = time.perf_counter()
+    df, error = read_table(payload)
+    stages['read_json'] = time.perf_counter() - t0
+    if error:
+        raise ValueError(error)
+
+    t0 = time.perf_counter()
+    df, error = prepare_schedule(df)
+    stages['parse'] = time.perf_counter() - t0
+    if error:
+        raise ValueError(error)
+
+    t0 = time.perf_counter()
+    model = ScheduleModel(df, FLEET.order)
+    stages['layout'] = time.perf_counter() - t0
+
+    if pipeline == 'xlsx':
+        t0 = time.perf_counter()
+        workbook = write_schedule(model, 'benchmark')['workbook']
+        stages['write'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        output = save_workbook(workbook).getvalue()
+        stages['save'] = time.perf_counter() - t0
+    elif pipeline == 'xlsx_stream':
+        # Igual que la ruta / con stream=1: libro de solo escritura, archivo temporal y lectura por bloques
+        t0 = time.perf_counter()
+        workbook = write_schedule_stream(model, 'benchmark')
+        stages['write'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        spool = spool_workbook(workbook)
+        del workbook
+        size = 0
+        while True:
+            chunk = spool.read(64 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+        spool.close()
+        stages['save'] = time.perf_counter() - t0
+        return stages, size
+    else:
+        buf, timings = render_gantt(model, 'benchmark', 'pdf')
+        stages.update({f'gantt_{stage}': seconds for stage, seconds in timings.items()})
+        output = buf.getvalue()
+    return stages, len(output)
+
+
+def run_case(legs, tails, days, pipeline, seed, memory):
+    # Corre dentro de un proceso aislado con FLEET_CONFIG ya apuntando a la flota sintetica
+    payload = json.dumps(synthetic_schedule(legs, tails, days, seed))
+    result = {'legs': legs, 'tails': tails, 'days': days, 'pipeline': pipeline, 'payload_bytes': len(payload)}
+    # La importacion de Flask, pandas y matplotlib se mide aparte para no mezclarla con el render
+    t0 = time.perf_counter()
+    import gantt_pdf, main
+    result['import'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    stages, output_bytes = run_pipeline(pipeline, payload)
+    result['wall'] = time.perf_counter() - t0
+    result['stages'] = stages
+    result['output_bytes'] = output_bytes
+    if memory:
+        # Segunda pasada con tracemalloc para no inflar los tiempos de la primera
+        tracemalloc.start()
+        run_pipeline(pipeline, payload)
+        result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_isolated(legs, tails, days, pipeline, seed, memory):
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_path = os.path.join(tmp, 'fleet.json')
+        write_fleet(tails, fleet_path)
+        env = dict(os.environ, FLEET_CONFIG=fleet_path)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', '--case', str(legs), str(tails), str(days),
+                   '--pipelines', pipeline, '--seed', str(seed)]
+        if not memory:
+            command.append('--no-memory')
+        try:
+            process = subprocess.run(command, capture_output=True, text=True, env=env, timeout=CASE_TIMEOUT,
+                                     cwd=os.path.dirname(os.path.abspath(__file__)))
+        except subprocess.TimeoutExpired:
+            return {'legs': legs, 'tails': tails, 'days': days, 'pipeline': pipeline, 'error': f'timeout after {CASE_TIMEOUT}s'}
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {'legs': legs, 'tails': tails, 'days': days, 'pipeline': pipeline,
+                'error': lines[-1] if lines else f'exit code {process.returncode}'}
+    return json.loads(process.stdout)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(previous, current):
+    # Relacion de tiempos y memoria contra un resultado anterior (>1 es mas lento)
+    before = {(r['legs'], r['tails'], r['days'], r['pipeline']): r for r in previous['results']}
+    for r in current['results']:
+        old = before.get((r['legs'], r['tails'], r['days'], r['pipeline']))
+        label = f"{r['pipeline']:>11} {r['legs']:>6} legs {r['tails']:>3} tails {r['days']:>2} days"
+        if old is None or 'error' in old or 'error' in r:
+            print(f"{label}  {r.get('error') or (old or {}).get('error') or 'no baseline'}")
+            continue
+        line = f"{label}  wall {r['wall'] / old['wall']:.2f}x"
+        if 'peak_memory' in r and 'peak_memory' in old:
+            line += f"  memory {r['peak_memory'] / old['peak_memory']:.2f}x"
+        line += f"  output {r['output_bytes'] / old['output_bytes']:.2f}x"
+        print(line)
+
+
+def summarize(results):
+    # Por caso: ms por tramo de cada ruta y xlsx_stream contra xlsx (la ruta de memoria acotada no
+    # debe quedar mas lenta que la normal)
+    by_case = {}
+    for r in results:
+        if 'error' not in r:
+            by_case.setdefault((r['legs'], r['tails'], r['days']), {})[r['pipeline']] = r['wall']
+    for (legs, tails, days), walls in by_case.items():
+        parts = [f'{pipeline} {wall * 1000 / legs:.2f} ms/leg' for pipeline, wall in walls.items()]
+        if 'xlsx' in walls and 'xlsx_stream' in walls:
+            parts.append(f"stream/xlsx {walls['xlsx_stream'] / walls['xlsx']:.2f}x")
+        print(f'{legs:>6} legs {tails:>3} tails {days:>2} days: ' + '  '.join(parts), file=sys.stderr)
+    # Exponente de crecimiento entre el caso mas chico y el mas grande: ~1 es lineal, ~2 cuadratico
+    by_pipeline = {}
+    for (legs, _, _), walls in sorted(by_case.items()):
+        for pipeline, wall in walls.items():
+            by_pipeline.setdefault(pipeline, []).append((legs, wall))
+    for pipeline, points in by_pipeline.items():
+        (first_legs, first_wall), (last_legs, last_wall) = points[0], points[-1]
+        if last_legs > first_legs:
+            exponent = math.log(last_wall / first_wall) / math.log(last_legs / first_legs)
+            print(f'{pipeline:>12} {first_legs}-{last_legs} legs: wall ~ legs^{exponent:.2f}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sintetico de los renderizadores xlsx y PDF')
+    parser.add_argument('--case', nargs=3, type=int, metavar=('LEGS', 'TAILS', 'DAYS'))
+    parser.add_argument('--quick', action='store_true', help='solo los casos pequeños')
+    parser.add_argument('--scaling', action='store_true', help='casos que duplican los tramos con la misma densidad')
+    parser.add_argument('--pipelines', default=','.join(PIPELINES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='omitir la pasada con tracemalloc')
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto salida estandar)')
+    parser.add_argument('--compare', help='resultado JSON anterior contra el que comparar')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    pipelines = [p for p in args.pipelines.split(',') if p]
+
+    if args.worker:
+        legs, tails, days = args.case
+        print(json.dumps(run_case(legs, tails, days, pipelines[0], args.seed, not args.no_memory)))
+        return
+
+    if args.case:
+        cases = [tuple(args.case)]
+    else:
+        cases = SCALING_CASES if args.scaling else QUICK_CASES if args.quick else CASES
+    results = []
+    for legs, tails, days in cases:
+        for pipeline in pipelines:
+            result = run_isolated(legs, tails, days, pipeline, args.seed, not args.no_memory)
+            print(f"{pipeline:>11} {legs:>6} legs {tails:>3} tails {days:>2} days: "
+                  f"{result.get('error') or format(result['wall'], '.3f') + 's'}", file=sys.stderr)
+            results.append(result)
+    summarize(results)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'seed': args.seed,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import heapq
+
+import numpy as np
+from openpyxl.cell import WriteOnlyCell
+
+from styles import FLIGHT_LABEL_FONT
+
+CONFLICT_SHEET_TITLE = 'Conflictos'
+CONFLICT_HEADER = ['Reg.', 'Flight', 'STD', 'STA', 'Carril', 'Conflicto con', 'STD', 'STA']
+
+
+def assign_lanes(tail, start_col, end_col):
+    # Barrido por aeronave ordenado por columna de inicio: O(n log n).
+    # Dos vuelos chocan si comparten al menos una columna de la hoja.
+    n = len(tail)
+    lane = np.zeros(n, dtype=np.int64)
+    conflict_with = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return lane, conflict_with
+
+    order = np.lexsort((end_col, start_col, tail))
+    sorted_tail = tail[order]
+    # Desplazar cada aeronave para que el maximo acumulado no cruce de una a otra
+    shift = (int(max(end_col.max(), start_col.max())) + 2) * sorted_tail
+    ends = end_col[order] + shift
+    starts = start_col[order] + shift
+    previous_end = np.maximum.accumulate(ends)
+    overlaps = np.zeros(n, dtype=bool)
+    overlaps[1:] = starts[1:] <= previous_end[:-1]
+    if not overlaps.any():
+        return lane, conflict_with
+
+    # Solo se recorren las aeronaves que tienen algun choque
+    for t in np.unique(sorted_tail[overlaps]):
+        active = []
+        free = []
+        num_lanes = 0
+        for i in order[sorted_tail == t].tolist():
+            start = int(start_col[i])
+            while active and active[0][0] < start:
+                _, free_lane, _ = heapq.heappop(active)
+                heapq.heappush(free, free_lane)
+            if active:
+                conflict_with[i] = active[0][2]
+            if free:
+                lane[i] = heapq.heappop(free)
+            else:
+                lane[i] = num_lanes
+                num_lanes += 1
+            heapq.heappush(active, (int(end_col[i]), int(lane[i]), i))
+    return lane, conflict_with
+
+
+def conflict_report(df, layout, order):
+    conflicted = np.flatnonzero(layout['conflict_with'] >= 0)
+    if len(conflicted) == 0:
+        return []
+    positions = layout['positions']
+    flights = df['Flight'].tolist()
+    std = df['fecha_salida'].dt.strftime('%d%b %H:%M').tolist()
+    sta = df['fecha_llegada'].dt.strftime('%d%b %H:%M').tolist()
+    report = []
+    for i in conflicted.tolist():
+        other = int(layout['conflict_with'][i])
+        p, q = positions[i], positions[other]
+        report.append({
+            'reg': order[layout['tail'][i]],
+            'flight': flights[p],
+            'std': std[p],
+            'sta': sta[p],
+            'lane': int(layout['lane'][i]),
+            'conflicts_with': {'flight': flights[q], 'std': std[q], 'sta': sta[q]},
+        })
+    return report
+
+
+def conflict_rows(report):
+    # Filas de la hoja de conflictos en el orden de CONFLICT_HEADER
+    for item in report:
+        other = item['conflicts_with']
+        yield [item['reg'], item['flight'], item['std'], item['sta'], item['lane'],
+               other['flight'], other['std'], other['sta']]
+
+
+def write_conflict_sheet(workbook, report):
+    if not report:
+        return
+    # Celdas de cabecera ya con estilo, así sirve también para libros de solo escritura
+    sheet = workbook.create_sheet(CONFLICT_SHEET_TITLE)
+    header = []
+    for title in CONFLICT_HEADER:
+        cell = WriteOnlyCell(sheet, title)
+        cell.font = FLIGHT_LABEL_FONT
+        header.append(cell)
+    sheet.append(header)
+    for row in conflict_rows(report):
+        sheet.append(row)
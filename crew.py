@@ -0,0 +1,160 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Columnas de texto libre con codigos de tripulantes y el rol que se les asigna
+CREW_COLUMNS = {'Crew': 'Crew', 'Tripadi': 'Tripadi'}
+# Los codigos se separan solo con / , ; + (un nombre con espacios es un solo tripulante)
+CREW_SEPARATORS = r'[/,;+]'
+INVALID_TITLE_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+# Un servicio empieza con la presentacion antes del primer vuelo y termina despues del ultimo;
+# un descanso de al menos DUTY_MIN_REST_HOURS abre un servicio nuevo
+DUTY_REPORT_MINUTES = int(os.environ.get('DUTY_REPORT_MINUTES', 60))
+DUTY_RELEASE_MINUTES = int(os.environ.get('DUTY_RELEASE_MINUTES', 30))
+DUTY_MIN_REST_MINUTES = int(float(os.environ.get('DUTY_MIN_REST_HOURS', 10)) * 60)
+
+SUMMARY_SHEET_TITLE = 'Resumen'
+SUMMARY_HEADER = ['Tripulante', 'Vuelos', 'Block', 'Horas de servicio', 'Servicios']
+ROSTER_HEADER = ['Fecha', 'Flight', 'Reg.', 'From', 'To', 'STD', 'STA', 'Rol', 'Block', 'Servicio N°']
+
+
+def hours_minutes(minutes):
+    minutes = np.asarray(minutes, dtype=np.int64)
+    return (pd.Series(minutes // 60).astype(str) + ':' + pd.Series(minutes % 60).astype(str).str.zfill(2)).to_numpy()
+
+
+class CrewRoster:
+    # Indice invertido tripulante -> vuelos y totales de block/servicio, calculados en una sola pasada
+    # vectorizada sobre el DataFrame ya convertido (con fecha_salida/fecha_llegada).
+    # Las asignaciones quedan ordenadas por tripulante y hora de salida.
+
+    def __init__(self, df):
+        frames = []
+        for column, role in CREW_COLUMNS.items():
+            if column not in df:
+                continue
+            values = df[column].reset_index(drop=True)
+            codes = values.where(values.notna(), '').astype(str).str.upper().str.split(CREW_SEPARATORS, regex=True).explode().str.strip()
+            codes = codes[codes.notna() & (codes != '')]
+            frames.append(pd.DataFrame({'crew': codes.to_numpy(), 'position': codes.index.to_numpy(dtype=np.int64), 'role': role}))
+        if frames:
+            assignments = pd.concat(frames, ignore_index=True).drop_duplicates(['crew', 'position'])
+        else:
+            assignments = pd.DataFrame({'crew': [], 'position': np.zeros(0, dtype=np.int64), 'role': []})
+
+        positions = assignments['position'].to_numpy(dtype=np.int64)
+        salida = df['fecha_salida'].to_numpy()[positions]
+        order = np.lexsort((salida, assignments['crew'].to_numpy(dtype=str)))
+        self.positions = positions[order]
+        self.roles = assignments['role'].to_numpy()[order]
+        codes, self.crew = pd.factorize(assignments['crew'].to_numpy()[order], sort=True)
+        self.salida = salida[order]
+        self.llegada = df['fecha_llegada'].to_numpy()[self.positions]
+        self.bounds = np.searchsorted(codes, np.arange(len(self.crew) + 1))
+
+        # Block por tramo y servicios: corte donde cambia el tripulante o el descanso es largo
+        self.block_minutes = ((self.llegada - self.salida) / np.timedelta64(1, 'm')).astype(np.int64)
+        n = len(self.positions)
+        new_duty = np.ones(n, dtype=bool)
+        if n:
+            rest = (self.salida[1:] - self.llegada[:-1]) / np.timedelta64(1, 'm')
+            new_duty[1:] = (codes[1:] != codes[:-1]) | (rest >= DUTY_MIN_REST_MINUTES)
+        self.duty = np.cumsum(new_duty) - 1
+        duty_starts = np.flatnonzero(new_duty)
+        if n:
+            duty_end = np.maximum.reduceat(self.llegada.astype('datetime64[m]').astype(np.int64), duty_starts)
+            duty_begin = self.salida[duty_starts].astype('datetime64[m]').astype(np.int64)
+            duty_minutes = duty_end - duty_begin + DUTY_REPORT_MINUTES + DUTY_RELEASE_MINUTES
+        else:
+            duty_minutes = np.zeros(0, dtype=np.int64)
+        self.duty_minutes = duty_minutes
+
+        num_crew = len(self.crew)
+        self.legs = np.diff(self.bounds)
+        self.total_block = np.bincount(codes, weights=self.block_minutes, minlength=num_crew).astype(np.int64)
+        self.total_duty = np.bincount(codes[duty_starts], weights=duty_minutes, minlength=num_crew).astype(np.int64)
+        self.duties = np.bincount(codes[duty_starts], minlength=num_crew)
+
+    def __len__(self):
+        return len(self.crew)
+
+    def index(self):
+        # tripulante -> posiciones de sus vuelos en el DataFrame, en orden de salida
+        return {crew: self.positions[self.bounds[i]:self.bounds[i + 1]] for i, crew in enumerate(self.crew)}
+
+    def summary(self):
+        return [{'crew': crew, 'legs': int(self.legs[i]), 'block_minutes': int(self.total_block[i]),
+                 'duty_minutes': int(self.total_duty[i]), 'duties': int(self.duties[i])}
+                for i, crew in enumerate(self.crew)]
+
+
+def roster_rows(df, roster):
+    # Filas de todas las hojas de una vez, en el orden de las asignaciones
+    positions = roster.positions
+
+    def column(name):
+        values = df[name].to_numpy()[positions] if name in df else np.full(len(positions), None, dtype=object)
+        return values.tolist()
+
+    salida = pd.DatetimeIndex(roster.salida)
+    llegada = pd.DatetimeIndex(roster.llegada)
+    duty_numbers = roster.duty - roster.duty[roster.bounds[:-1]].repeat(roster.legs) + 1
+    return list(zip(salida.strftime('%d%b').tolist(), column('Flight'), column('Reg.'), column('From'), column('To'),
+                    salida.strftime('%H:%M').tolist(), llegada.strftime('%H:%M').tolist(), roster.roles.tolist(),
+                    hours_minutes(roster.block_minutes).tolist(), duty_numbers.tolist()))
+
+
+def sheet_title(crew, used):
+    # Excel pide titulos de hasta 31 caracteres, sin []:*?/\ y distintos sin importar mayusculas.
+    # Los repetidos llevan un numero al final y la base se corta para que el sufijo entre en los 31
+    base = INVALID_TITLE_CHARS.sub('_', crew) or '_'
+    title = base[:31]
+    number = 1
+    while title.lower() in used:
+        suffix = str(number)
+        title = base[:31 - len(suffix)] + suffix
+        number += 1
+    used.add(title.lower())
+    return title
+
+
+def write_roster(df, roster, additional_text):
+    # Libro de solo escritura: hoja de resumen y una hoja por tripulante con sus totales al final
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from styles import FLIGHT_LABEL_FONT
+
+    def header(sheet, titles):
+        cells = []
+        for title in titles:
+            cell = WriteOnlyCell(sheet, title)
+            cell.font = FLIGHT_LABEL_FONT
+            cells.append(cell)
+        sheet.append(cells)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    block = hours_minutes(roster.total_block).tolist()
+    duty = hours_minutes(roster.total_duty).tolist()
+
+    summary = workbook.create_sheet(SUMMARY_SHEET_TITLE)
+    if additional_text:
+        summary.append([additional_text])
+    header(summary, SUMMARY_HEADER)
+    for i, crew in enumerate(roster.crew):
+        summary.append([crew, int(roster.legs[i]), block[i], duty[i], int(roster.duties[i])])
+
+    rows = roster_rows(df, roster)
+    used = {SUMMARY_SHEET_TITLE.lower()}
+    for i, crew in enumerate(roster.crew):
+        sheet = workbook.create_sheet(sheet_title(crew, used))
+        header(sheet, ROSTER_HEADER)
+        for row in rows[roster.bounds[i]:roster.bounds[i + 1]]:
+            sheet.append(row)
+        sheet.append([])
+        total = WriteOnlyCell(sheet, 'Total')
+        total.font = FLIGHT_LABEL_FONT
+        sheet.append([total, None, None, None, None, None, None, None, block[i], duty[i]])
+    return workbook
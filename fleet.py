@@ -0,0 +1,60 @@
+import json
+import os
+
+import numpy as np
+
+DEFAULT_FLEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fleet.json')
+
+
+class FleetLayout:
+    # Indice de filas de la flota: se calcula una vez y se reutiliza en cada solicitud
+
+    def __init__(self, tails, heights, first_row=6):
+        self.order = list(tails)
+        self.index = {reg: i for i, reg in enumerate(self.order)}
+        self.tail_set = frozenset(self.order)
+        heights = np.asarray(heights, dtype=np.int64)
+        self.heights = heights
+        self.first_row = first_row
+        self.band_start = first_row + np.concatenate(([0], np.cumsum(heights)[:-1])).astype(np.int64)
+        self.band_end = self.band_start + heights - 1
+        self.last_row = int(self.band_end[-1]) if len(self.order) else first_row - 1
+        # Filas con borde grueso en la columna A y líneas horizontales entre franjas
+        self.edge_rows = frozenset(self.band_start.tolist()) | frozenset(self.band_end.tolist())
+        self.separator_rows = self.band_start.tolist() + [self.last_row + 1]
+
+    def with_lanes(self, lanes_per_tail, lane_height, reserved_rows):
+        # Agranda las franjas que necesitan carriles extra; sin choques devuelve el mismo indice
+        needed = reserved_rows + lane_height * np.maximum(np.asarray(lanes_per_tail, dtype=np.int64), 1)
+        if (needed <= self.heights).all():
+            return self
+        return FleetLayout(self.order, np.maximum(self.heights, needed), self.first_row)
+
+    def subset(self, regs):
+        # Solo algunas aeronaves, en el orden de la flota y con sus mismas alturas
+        regs = set(regs)
+        keep = [reg for reg in self.order if reg in regs]
+        return FleetLayout(keep, [int(self.heights[self.index[reg]]) for reg in keep], self.first_row)
+
+    def band(self, reg):
+        i = self.index[reg]
+        return int(self.band_start[i]), int(self.band_end[i])
+
+    def missing_tails(self, regs):
+        missing = self.tail_set.difference(regs)
+        return sorted(missing, key=self.index.__getitem__)
+
+
+def load_fleet(path=None, rows_key='rows'):
+    # rows_key elige la altura de franja de cada aplicacion; sin esa llave se usa 'rows'
+    path = path or os.environ.get('FLEET_CONFIG', DEFAULT_FLEET_PATH)
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    tails = config['tails']
+    return FleetLayout([tail['reg'] for tail in tails], [tail.get(rows_key, tail['rows']) for tail in tails],
+                       config.get('first_row', 6))
+
+
+FLEET = load_fleet()
+# main.py mantiene sus franjas fijas de 10 filas
+MAIN_FLEET = load_fleet(rows_key='main_rows')
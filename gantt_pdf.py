@@ -0,0 +1,134 @@
+import io
+import threading
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.text import Text
+
+RECT_HEIGHT = 0.2
+FIGSIZE = (20, 10)
+TEMPLATES_PER_THREAD = 8
+# Sin vuelos: un dia (00:00 a 24:00) en fechas de matplotlib
+EMPTY_XLIM = (0, 1)
+
+# Una figura plantilla por hilo: ejes, ticks y formato se configuran una sola vez
+_templates = threading.local()
+
+
+def text_fits(text_lengths, durations_hours):
+    return durations_hours >= text_lengths * 0.02
+
+
+def _label_text(values):
+    # Vacios (None/NaN) quedan como '' igual que en el xlsx, no como 'None' o 'nan'
+    import pandas as pd
+
+    return pd.Series(values, dtype=object).fillna('').astype(str).to_numpy()
+
+
+def _add_labels(ax, xs, ys, texts, sizes, has, vas):
+    # Un Text por etiqueta: el PDF lleva texto real (se puede seleccionar y buscar) con el kerning de la
+    # fuente. Agruparlas como trazos en una coleccion por tamaño es unas tres veces mas rapido pero
+    # pierde el texto, asi que solo las barras van agrupadas. Las propiedades de fuente se arman una vez
+    # por tamaño en lugar de una vez por etiqueta
+    fonts = {size: FontProperties(size=size) for size in set(sizes)}
+    for x, y, text, size, ha, va in zip(xs.tolist(), ys.tolist(), texts.tolist(), sizes, has, vas.tolist()):
+        if text:
+            ax.add_artist(Text(x, y, text, ha=ha, va=va, color='black', fontproperties=fonts[size],
+                               transform=ax.transData, clip_on=False))
+
+
+def _template(order, lanes):
+    # Una franja por aeronave de tantas unidades de alto como carriles tenga (como en el SVG);
+    # la etiqueta del eje queda centrada en su franja
+    key = (tuple(order), tuple(lanes.tolist()))
+    cached = getattr(_templates, 'figures', None)
+    if cached is None:
+        cached = _templates.figures = {}
+    if key not in cached:
+        if len(cached) >= TEMPLATES_PER_THREAD:
+            cached.clear()
+        total = int(lanes.sum())
+        band_top = np.cumsum(lanes) - lanes
+        fig = Figure(figsize=FIGSIZE)
+        ax = fig.add_subplot()
+        ax.set_yticks(total - 1 - band_top - (lanes - 1) / 2)
+        ax.set_yticklabels(order)
+        ax.set_ylim(-1, total)
+        ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+        ax.tick_params(axis='x', labelrotation=45, labelsize=10)
+        fig.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.15)
+        ax.set_xlabel('Hora')
+        ax.set_ylabel('Aeronave')
+        cached[key] = (fig, ax)
+    return cached[key]
+
+
+def render_gantt(model, additional_text, fmt='pdf', bar_color='lightblue'):
+    # Dibuja un ScheduleModel. Devuelve (buffer, tiempos por etapa en segundos)
+    order = model.order
+    timings = {}
+    t0 = time.perf_counter()
+
+    # Cada vuelo va en su carril dentro de la franja de su aeronave, asi los solapados no se pisan
+    lanes = np.maximum(model.layout['lanes_per_tail'], 1)
+    band_top = np.cumsum(lanes) - lanes
+    y = (int(lanes.sum()) - 1 - band_top[model.tail] - model.lane).astype(float)
+    start = mdates.date2num(model.salida)
+    end = mdates.date2num(model.llegada)
+    width = end - start
+    hours = width * 24
+    flights = _label_text(model.labels['flight'])
+    origins = _label_text(model.labels['origin'])
+    destinations = _label_text(model.labels['destination'])
+    salidas = model.labels['std']
+    llegadas = model.labels['sta']
+    length = np.vectorize(len, otypes=[np.int64])
+    flight_fits = text_fits(length(flights) if len(flights) else np.zeros(0), hours)
+    origin_fits = text_fits(length(origins) if len(origins) else np.zeros(0), hours)
+    destination_fits = text_fits(length(destinations) if len(destinations) else np.zeros(0), hours)
+    below = y - RECT_HEIGHT
+    n = len(y)
+
+    # Etiquetas: numero de vuelo, origen, destino, hora de salida y hora de llegada
+    xs = np.concatenate([start + width / 2, start, end, start, end])
+    ys = np.concatenate([np.where(flight_fits, y, below), np.where(origin_fits, y + 0.2, below),
+                         np.where(destination_fits, y + 0.2, below), y - 0.2, y - 0.2])
+    texts = np.concatenate([flights, origins, destinations, salidas, llegadas])
+    sizes = [8] * (3 * n) + [6] * (2 * n)
+    has = ['center'] * n + ['left'] * n + ['right'] * n + ['left'] * n + ['right'] * n
+    vas = np.concatenate([np.where(flight_fits, 'center', 'top'), np.where(origin_fits, 'center', 'top'),
+                          np.where(destination_fits, 'center', 'top'), ['center'] * (2 * n)])
+    timings['layout'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fig, ax = _template(order, lanes)
+    for artist in list(ax.collections) + list(ax.texts):
+        artist.remove()
+    verts = np.stack([np.column_stack([start, y - RECT_HEIGHT / 2]), np.column_stack([start + width, y - RECT_HEIGHT / 2]),
+                      np.column_stack([start + width, y + RECT_HEIGHT / 2]), np.column_stack([start, y + RECT_HEIGHT / 2])], axis=1)
+    ax.add_collection(PolyCollection(verts, facecolors=bar_color), autolim=False)
+    # La figura se reutiliza: los limites se fijan siempre, o quedarian los del render anterior
+    if n:
+        ax.set_xlim(mdates.date2num(model.salida.min() - np.timedelta64(1, 'h')),
+                    mdates.date2num(model.llegada.max() + np.timedelta64(1, 'h')))
+        _add_labels(ax, xs, ys, texts, sizes, has, vas)
+    else:
+        ax.set_xlim(EMPTY_XLIM)
+    ax.set_title(f'Programación de Vuelos QT {additional_text}')
+    timings['draw'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    buf.seek(0)
+    timings['save'] = time.perf_counter() - t0
+    return buf, timings
+
@@ -0,0 +1,81 @@
+import html
+
+import numpy as np
+import pandas as pd
+
+# Geometria en pixeles del diagrama SVG
+MINUTE_WIDTH = 0.6
+LABEL_WIDTH = 90
+HEADER_HEIGHT = 60
+LANE_HEIGHT = 34
+BAR_HEIGHT = 20
+BAR_COLOR = '#add8e6'
+CONFLICT_COLOR = '#f4a6a6'
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return html.escape(str(value))
+
+
+def render_svg(model, additional_text):
+    # Una franja por aeronave con un carril por cada grupo de vuelos solapados; mismo modelo que el xlsx y el PDF
+    lanes = np.maximum(model.layout['lanes_per_tail'], 1)
+    band_top = HEADER_HEIGHT + LANE_HEIGHT * np.concatenate([[0], np.cumsum(lanes)[:-1]])
+    height = HEADER_HEIGHT + LANE_HEIGHT * int(lanes.sum()) + 10
+    minutes = (model.num_columns - 1) * 15
+    width = LABEL_WIDTH + minutes * MINUTE_WIDTH + 20
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height}" '
+             f'viewBox="0 0 {width:.0f} {height}" font-family="Calibri, Arial, sans-serif" font-size="11">',
+             f'<text x="{width / 2:.0f}" y="18" text-anchor="middle" font-size="16" font-weight="bold">'
+             f'Programación de Vuelos QT {_text(additional_text)}</text>']
+
+    # Eje de horas
+    for hour in range(0, minutes + 1, 60):
+        x = LABEL_WIDTH + hour * MINUTE_WIDTH
+        label = (model.start_time + pd.Timedelta(minutes=hour)).strftime('%H:%M')
+        parts.append(f'<line x1="{x:.1f}" y1="{HEADER_HEIGHT - 8}" x2="{x:.1f}" y2="{height - 10}" stroke="#ddd"/>')
+        parts.append(f'<text x="{x:.1f}" y="{HEADER_HEIGHT - 12}" text-anchor="middle" fill="#8b0000" font-weight="bold">{label}</text>')
+
+    # Franjas de las aeronaves
+    for t, reg in enumerate(model.order):
+        top = int(band_top[t])
+        band_height = LANE_HEIGHT * int(lanes[t])
+        parts.append(f'<rect x="0" y="{top}" width="{LABEL_WIDTH}" height="{band_height}" fill="#d3d3d3" stroke="#000"/>')
+        parts.append(f'<text x="{LABEL_WIDTH / 2:.0f}" y="{top + band_height / 2 + 5:.0f}" text-anchor="middle" '
+                     f'font-size="14" font-weight="bold">{_text(reg)}</text>')
+        parts.append(f'<line x1="0" y1="{top + band_height}" x2="{width:.0f}" y2="{top + band_height}" stroke="#000"/>')
+
+    # Vuelos
+    if len(model):
+        start = np.datetime64(model.start_time)
+        x0 = LABEL_WIDTH + (model.salida - start) / np.timedelta64(1, 'm') * MINUTE_WIDTH
+        x1 = LABEL_WIDTH + (model.llegada - start) / np.timedelta64(1, 'm') * MINUTE_WIDTH
+        y = band_top[model.tail] + LANE_HEIGHT * model.lane + (LANE_HEIGHT - BAR_HEIGHT) / 2
+        conflicted = model.layout['conflict_with'] >= 0
+        labels = model.labels
+        for i in range(len(model)):
+            color = CONFLICT_COLOR if conflicted[i] else BAR_COLOR
+            tooltip = ' '.join(filter(None, (_text(labels['flight'][i]), _text(labels['origin'][i]), labels['std'][i],
+                                             _text(labels['destination'][i]), labels['sta'][i], _text(labels['crew'][i]))))
+            parts.append(f'<g><title>{tooltip}</title>'
+                         f'<rect x="{x0[i]:.1f}" y="{y[i]:.1f}" width="{x1[i] - x0[i]:.1f}" height="{BAR_HEIGHT}" '
+                         f'fill="{color}" stroke="#000" stroke-width="0.5"/>'
+                         f'<text x="{(x0[i] + x1[i]) / 2:.1f}" y="{y[i] + BAR_HEIGHT / 2 + 4:.1f}" text-anchor="middle" '
+                         f'font-weight="bold">{_text(labels["flight"][i])}</text>'
+                         f'<text x="{x0[i]:.1f}" y="{y[i] - 2:.1f}" font-size="8">{_text(labels["origin"][i])} {labels["std"][i]}</text>'
+                         f'<text x="{x1[i]:.1f}" y="{y[i] - 2:.1f}" font-size="8" text-anchor="end">'
+                         f'{labels["sta"][i]} {_text(labels["destination"][i])}</text></g>')
+
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def render_html(model, additional_text):
+    # Pagina autocontenida con el SVG en linea, para abrir en el navegador o compartir por correo
+    return ('<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>Programación de Vuelos QT {_text(additional_text)}</title>\n'
+            '<style>body { margin: 0; overflow: auto; }</style>\n</head>\n<body>\n'
+            f'{render_svg(model, additional_text)}\n</body>\n</html>\n')
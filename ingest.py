@@ -0,0 +1,117 @@
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+
+# Columnas que usan los renderizadores; el cliente envia solo estas, una lista por columna
+REQUIRED_COLUMNS = ['Flight', 'STD', 'STA', 'Reg.']
+OPTIONAL_COLUMNS = ['From', 'To', 'Crew', 'Notas', 'Tripadi']
+DATE_FORMAT = '%d%b %H:%M'
+
+
+MONTHS = np.array([b'apr', b'aug', b'dec', b'feb', b'jan', b'jul', b'jun', b'mar', b'may', b'nov', b'oct', b'sep'])
+MONTH_NUMBERS = np.array([4, 8, 12, 2, 1, 7, 6, 3, 5, 11, 10, 9])
+
+
+def _fast_parse(strings, year):
+    # Lectura vectorizada de 'DDMon HH:MM' (11 caracteres ASCII). Devuelve (fechas, valido);
+    # lo que no encaja en el formato fijo se deja a pandas.
+    dates = np.full(len(strings), np.datetime64('NaT'), dtype='datetime64[m]')
+    valid = np.char.str_len(strings) == 11
+    if not valid.any():
+        return dates, valid
+    try:
+        raw = strings[valid].astype('S11')
+    except UnicodeEncodeError:
+        return dates, np.zeros(len(strings), dtype=bool)
+    chars = raw.view(np.uint8).reshape(-1, 11).astype(np.int64)
+    digits = chars[:, [0, 1, 6, 7, 9, 10]] - ord('0')
+    ok = ((digits >= 0) & (digits <= 9)).all(axis=1) & (chars[:, 5] == ord(' ')) & (chars[:, 8] == ord(':'))
+    month_names = np.ascontiguousarray(raw.view(np.uint8).reshape(-1, 11)[:, 2:5] | 0x20).view('S3').ravel()
+    slot = np.clip(np.searchsorted(MONTHS, month_names), 0, len(MONTHS) - 1)
+    ok &= MONTHS[slot] == month_names
+    month = MONTH_NUMBERS[slot]
+    day = digits[:, 0] * 10 + digits[:, 1]
+    hour = digits[:, 2] * 10 + digits[:, 3]
+    minute = digits[:, 4] * 10 + digits[:, 5]
+    month_start = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    month_days = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+    ok &= (day >= 1) & (day <= month_days) & (hour < 24) & (minute < 60)
+    parsed = month_start.astype('datetime64[D]') + (day - 1) + (hour * 60 + minute).astype('timedelta64[m]')
+    indices = np.flatnonzero(valid)
+    dates[indices[ok]] = parsed[ok]
+    valid[indices[~ok]] = False
+    return dates, valid
+
+
+def _parse_unique(strings, year):
+    dates, valid = _fast_parse(strings, year)
+    if not valid.all():
+        dates[~valid] = pd.to_datetime(pd.Series(strings[~valid]).radd(f'{year} '), format='%Y ' + DATE_FORMAT).to_numpy()
+    return dates
+
+
+def parse_dates(values, reference_year=None):
+    # Convierte cadenas 'DDMon HH:MM' a datetime64 analizando cada cadena distinta una sola vez.
+    # Si el horario cruza de diciembre a enero, los meses bajos pasan al año siguiente.
+    year = reference_year or datetime.date.today().year
+    values = np.asarray(values, dtype=object)
+    present = pd.notna(values) & (values != '')
+    codes, uniques = pd.factorize(values[present])
+    uniques = np.asarray(uniques, dtype=str)
+    parsed = _parse_unique(uniques, year)
+    months = parsed.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    if len(months) and months.max() - months.min() > 6:
+        wrapped = months <= 6
+        parsed[wrapped] = _parse_unique(uniques[wrapped], year + 1)
+    dates = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+    dates[present] = parsed[codes]
+    return dates
+
+
+def with_dates(df, reference_year=None):
+    # Agrega fecha_salida/fecha_llegada a una tabla leida por filas, con el mismo año de referencia
+    # que la entrada columnar (pd.to_datetime sin año usaria 1900)
+    if 'fecha_salida' in df and 'fecha_llegada' in df:
+        return df, None
+    for name in ('STD', 'STA'):
+        if name not in df:
+            return None, f"Missing column in input data: '{name}'"
+    try:
+        dates = parse_dates(np.concatenate([df['STD'].to_numpy(dtype=object), df['STA'].to_numpy(dtype=object)]), reference_year)
+    except ValueError as e:
+        return None, f"Date conversion error: {e}"
+    df = df.copy()
+    df['fecha_salida'] = dates[:len(df)]
+    df['fecha_llegada'] = dates[len(df):]
+    return df, None
+
+
+def parse_columns(payload, reference_year=None):
+    # Valida el formato columnar {"columns": {"Flight": [...], ...}} y devuelve (DataFrame, error)
+    try:
+        columns = json.loads(payload)['columns'] if isinstance(payload, str) else payload['columns']
+    except (ValueError, KeyError, TypeError) as e:
+        return None, f"JSON parsing error: {e}"
+    if not isinstance(columns, dict):
+        return None, "JSON parsing error: 'columns' must be an object of arrays"
+    for name in REQUIRED_COLUMNS:
+        if name not in columns:
+            return None, f"Missing column in input data: '{name}'"
+    lengths = {len(values) for name, values in columns.items() if name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+    if len(lengths) != 1:
+        return None, "Column length mismatch in input data"
+    num_rows = lengths.pop()
+
+    data = {}
+    for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        values = columns.get(name)
+        data[name] = np.array(values if values is not None else [None] * num_rows, dtype=object)
+    try:
+        dates = parse_dates(np.concatenate([data['STD'], data['STA']]), reference_year)
+    except ValueError as e:
+        return None, f"Date conversion error: {e}"
+    data['fecha_salida'] = dates[:num_rows]
+    data['fecha_llegada'] = dates[num_rows:]
+    return pd.DataFrame(data), None
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    # Cola de trabajos de generacion ejecutados en un pool de procesos acotado.
+    # Los resultados se guardan hasta result_ttl segundos despues de terminar. Un trabajo que pasa de
+    # timeout segundos se da por fallido y su proceso se mata (ver _expire).
+
+    def __init__(self, max_workers=2, max_pending=16, timeout=60, result_ttl=600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._jobs = {}
+        # RLock: si el future ya termino, add_done_callback llama a _mark_finished en el mismo hilo
+        self._lock = threading.RLock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _discard_executor(self, terminate=False):
+        # El pool descartado no recibe mas trabajos. Con terminate se matan sus procesos: uno colgado
+        # nunca termina por su cuenta y seguiria ocupando un lugar del pool
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        if terminate:
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, job):
+        # Si el pool se rompio (un proceso murio, por ejemplo por falta de memoria) se arma uno nuevo
+        try:
+            future = self._get_executor().submit(job['fn'], *job['args'])
+        except BrokenProcessPool:
+            self._discard_executor()
+            future = self._get_executor().submit(job['fn'], *job['args'])
+        job['future'] = future
+        job['executor'] = self._executor
+        job['started'] = time.monotonic()
+        future.add_done_callback(lambda done, job=job: self._mark_finished(job, done))
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self._expire()
+            self._cleanup()
+            pending = sum(1 for job in self._jobs.values() if job['finished'] is None)
+            if pending >= self.max_pending:
+                raise QueueFull(f"Render queue is full ({pending} pending jobs)")
+            job_id = uuid.uuid4().hex
+            job = self._jobs[job_id] = {'fn': fn, 'args': args, 'finished': None}
+            self._start(job)
+            return job_id
+
+    def _mark_finished(self, job, future):
+        with self._lock:
+            # Los futures de un pool descartado ya no son los del trabajo (se reenvio a otro pool)
+            if job['future'] is not future or job['finished'] is not None:
+                return
+            job['finished'] = time.monotonic()
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool) \
+                    and job['executor'] is self._executor:
+                self._discard_executor()
+
+    def _expire(self):
+        # Aplica el timeout. Un trabajo que sigue en cola se cancela; uno en curso no se puede
+        # interrumpir dentro del pool, así que se descarta el pool matando sus procesos y los demas
+        # trabajos que estaban en el se reenvian a un pool nuevo con el reloj en cero
+        for job in list(self._jobs.values()):
+            if job['finished'] is not None or time.monotonic() - job['started'] <= self.timeout:
+                continue
+            job['finished'] = time.monotonic()
+            job['timed_out'] = True
+            if job['future'].cancel() or job['future'].done() or job['executor'] is not self._executor:
+                continue
+            stuck = job['executor']
+            self._discard_executor(terminate=True)
+            for other in self._jobs.values():
+                future = other['future']
+                if other['finished'] is None and other['executor'] is stuck and \
+                        (not future.done() or future.cancelled() or isinstance(future.exception(), BrokenProcessPool)):
+                    self._start(other)
+
+    def status(self, job_id):
+        # Devuelve (estado, resultado, error) o None si el trabajo no existe o ya expiro
+        with self._lock:
+            self._expire()
+            self._cleanup()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.get('timed_out'):
+                return 'failed', None, f"Render timed out after {self.timeout} s"
+            future = job['future']
+            if not future.done():
+                return 'running' if future.running() else 'queued', None, None
+        error = future.exception()
+        if error is not None:
+            return 'failed', None, f"Render error: {error}"
+        result, error = future.result()
+        if error:
+            return 'failed', None, error
+        return 'done', result, None
+
+    def _cleanup(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished'] is not None and now - job['finished'] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def depth(self):
+        with self._lock:
+            self._expire()
+            return sum(1 for job in self._jobs.values() if job['finished'] is None)
+
+
+def queue_from_env():
+    return JobQueue(max_workers=int(os.environ.get('RENDER_WORKERS', 2)),
+                    max_pending=int(os.environ.get('RENDER_QUEUE_MAX', 16)),
+                    timeout=float(os.environ.get('RENDER_JOB_TIMEOUT', 60)),
+                    result_ttl=float(os.environ.get('RENDER_RESULT_TTL', 600)))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from conflicts import assign_lanes
+
+# Cada columna de la hoja representa 15 minutos
+SLOT_SECONDS = 900
+FIRST_TIME_COL = 2
+
+
+def compute_layout(df, order, start_time):
+    # Calcula la geometria de todos los vuelos de una sola vez con arreglos de NumPy.
+    # Los vuelos que se solapan en una aeronave se apilan en carriles adicionales.
+    codes = pd.Categorical(df['Reg.'], categories=order).codes
+    positions = np.flatnonzero(codes >= 0)
+    positions = positions[np.argsort(codes[positions], kind='stable')]
+    tail = codes[positions].astype(np.int64)
+
+    salida = df['fecha_salida'].to_numpy()[positions]
+    llegada = df['fecha_llegada'].to_numpy()[positions]
+    offset_slots = (salida - np.datetime64(start_time)) / np.timedelta64(SLOT_SECONDS, 's')
+    duration_slots = (llegada - salida) / np.timedelta64(SLOT_SECONDS, 's')
+
+    start_col = FIRST_TIME_COL + offset_slots.astype(np.int64)
+    end_col = start_col + duration_slots.astype(np.int64)
+    mid_col = start_col + (end_col - start_col) // 2
+    lane, conflict_with = assign_lanes(tail, start_col, end_col)
+    lanes_per_tail = np.zeros(len(order), dtype=np.int64)
+    np.maximum.at(lanes_per_tail, tail, lane + 1)
+
+    # Limites de cada aeronave dentro de los arreglos ordenados
+    bounds = np.searchsorted(tail, np.arange(len(order) + 1))
+
+    return {
+        'positions': positions,
+        'tail': tail,
+        'start_col': start_col,
+        'end_col': end_col,
+        'mid_col': mid_col,
+        'lane': lane,
+        'conflict_with': conflict_with,
+        'lanes_per_tail': lanes_per_tail,
+        'bounds': bounds,
+    }
+
+
+def place_rows(layout, band_rows, lane_height):
+    # band_rows[i] es la fila base de la franja de order[i]; cada carril baja lane_height filas
+    layout['row'] = np.asarray(band_rows, dtype=np.int64)[layout['tail']] + lane_height * layout['lane']
+    return layout
+
+
+def tail_range(layout, tail_index):
+    bounds = layout['bounds']
+    return range(int(bounds[tail_index]), int(bounds[tail_index + 1]))
+
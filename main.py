@@ -1,14 +1,45 @@
-from flask import Flask, render_template, request, send_file, jsonify 
-import pandas as pd
-import openpyxl
-from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
-from openpyxl.utils import get_column_letter
+from flask import Flask, Response, render_template, request, send_file, jsonify
 import io
+import json
 import os
+import tempfile
+import zipfile
+
+from batch import stream_zip
+from jobs import QueueFull, queue_from_env
+from metrics import format_timings, measure_peak_memory, metrics_from_env, stage, timing_header_from_env
+from fleet import MAIN_FLEET
+from preview import preview_cache_from_env
+from render_cache import cache_key, cache_from_env
+from sessions import sessions_from_env
+from startup import tiny_schedule, warmup_from_env
+
+# pandas, openpyxl y matplotlib (y los modulos que los usan) se importan dentro de las funciones,
+# asi el proceso arranca sin pagarlos; WARMUP=1 los carga y genera un horario minimo al iniciar.
 
 app = Flask(__name__)
+render_cache = cache_from_env()
+preview_cache = preview_cache_from_env()
+job_queue = queue_from_env()
+session_store = sessions_from_env()
+request_metrics = metrics_from_env()
+timing_header = timing_header_from_env()
+
+# Modo de salida por partes: el libro se guarda en un archivo temporal que pasa a disco al superar
+# SPOOL_MAX_BYTES y se envía en bloques, sin copia completa en memoria
+stream_responses = os.environ.get('STREAM_RESPONSES', '0') == '1'
+SPOOL_MAX_BYTES = int(os.environ.get('SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Filas que ocupa cada carril de vuelos dentro de la franja de una aeronave
+LANE_HEIGHT = 6
+
+def parse_schedule(df):
+    import pandas as pd
 
-def process_and_plot(df, additional_text):
+    # La entrada columnar ya llega con las fechas convertidas
+    if 'fecha_salida' in df and 'fecha_llegada' in df:
+        return df.dropna(subset=['fecha_salida', 'fecha_llegada']), None
     try:
         df['fecha_salida'] = pd.to_datetime(df['STD'], format='%d%b %H:%M', dayfirst=True)
         df['fecha_llegada'] = pd.to_datetime(df['STA'], format='%d%b %H:%M', dayfirst=True)
@@ -16,18 +47,101 @@ def process_and_plot(df, additional_text):
         return None, f"Missing column in input data: {e}"
     except ValueError as e:
         return None, f"Date conversion error: {e}"
+    return df.dropna(subset=['fecha_salida', 'fecha_llegada']), None
 
-    df = df.dropna(subset=['fecha_salida', 'fecha_llegada'])
-    order = ['N330QT', 'N331QT', 'N332QT', 'N334QT', 'N335QT', 'N336QT', 'N337QT']
+def merge_label(sheet, row, start_col, end_col):
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.merge import MergedCellRange
+
+    # Igual que sheet.merge_cells, pero sin buscar el rango dentro de todos los ya combinados (eso
+    # recorre la hoja entera en cada vuelo). Las etiquetas de un mismo carril nunca se solapan
+    merged = MergedCellRange(sheet, f'{get_column_letter(start_col)}{row}:{get_column_letter(end_col)}{row}')
+    sheet.merged_cells.ranges.add(merged)
+    sheet._clean_merge_range(merged)
+
+def paint_flights(sheet, model, indices):
+    from styles import FILL_BLUE, FILL_YELLOW, CENTER, FLIGHT_LABEL_FONT
+
+    flights = model.labels['flight']
+    notas = model.labels['notas']
+    crew = model.labels['crew']
+    tripadi = model.labels['tripadi']
+    layout = model.layout
+    start_cols = layout['start_col']
+    end_cols = layout['end_col']
+    mid_cols = layout['mid_col']
+    rows = layout['row']
+
+    for i in indices:
+        start_col, end_col, mid_col, current_row = int(start_cols[i]), int(end_cols[i]), int(mid_cols[i]), int(rows[i])
+        for col in range(start_col, end_col + 1):
+            sheet.cell(row=current_row + 1, column=col).fill = FILL_BLUE
+            sheet.cell(row=current_row + 2, column=col).fill = FILL_BLUE
+            sheet.cell(row=current_row + 3, column=col).fill = FILL_YELLOW
+
+        cell = sheet.cell(row=current_row + 2, column=mid_col)
+        cell.value = flights[i]
+        cell.alignment = CENTER
+        cell.font = FLIGHT_LABEL_FONT
+
+        merge_label(sheet, current_row + 4, start_col, end_col)
+        sheet.cell(row=current_row + 4, column=start_col).value = notas[i]
+        sheet.cell(row=current_row + 4, column=start_col).alignment = CENTER
+
+        merge_label(sheet, current_row + 5, start_col, end_col)
+        sheet.cell(row=current_row + 5, column=start_col).value = crew[i]
+        sheet.cell(row=current_row + 5, column=start_col).alignment = CENTER
+
+        merge_label(sheet, current_row + 6, start_col, end_col)
+        sheet.cell(row=current_row + 6, column=start_col).value = tripadi[i]
+        sheet.cell(row=current_row + 6, column=start_col).alignment = CENTER
+
+def flight_cells(model, indices):
+    # Celdas (fila, columna) que ocupa cada vuelo: tres filas de franja y tres de etiquetas combinadas
+    layout = model.layout
+    for i in indices:
+        start_col, end_col, current_row = int(layout['start_col'][i]), int(layout['end_col'][i]), int(layout['row'][i])
+        for row in range(current_row + 1, current_row + 7):
+            for col in range(start_col, end_col + 1):
+                yield row, col
+
+def fill_empty(sheet, model, indices, first_row, last_row):
+    from styles import FILL_WHITE
+
+    # El fondo blanco de las franjas es un estilo de fila: las celdas vacías no se crean.
+    # Solo las celdas de los vuelos que quedaron sin valor llevan el relleno en la propia celda
+    for row in range(first_row, last_row + 1):
+        sheet.row_dimensions[row].fill = FILL_WHITE
+    for row, col in flight_cells(model, indices):
+        cell = sheet.cell(row=row, column=col)
+        if cell.value is None:
+            cell.fill = FILL_WHITE
+
+def prepare_schedule(df, fleet=MAIN_FLEET):
+    import pandas as pd
+
+    # Fechas convertidas, todas las aeronaves presentes y filas ordenadas por aeronave
+    df, error = parse_schedule(df)
+    if error:
+        return None, error
+
+    order = fleet.order
 
     # Verificar si todas las aeronaves están presentes en la columna 'Reg.'
-    missing_aircraft = [aircraft for aircraft in order if aircraft not in df['Reg.'].unique()]
+    missing_aircraft = fleet.missing_tails(df['Reg.'].unique())
     if missing_aircraft:
         return None, f"Favor ingresar contenido para las matriculas faltantes: {', '.join(missing_aircraft)}"
 
     df['aeronave'] = pd.Categorical(df['Reg.'], categories=order, ordered=True)
-    df = df.sort_values('aeronave', ascending=False)
+    return df.sort_values('aeronave', ascending=False, kind='stable'), None
 
+def write_schedule(model, additional_text, fleet=MAIN_FLEET):
+    import openpyxl
+    from conflicts import write_conflict_sheet
+    from layout import place_rows
+    from styles import CENTER, TITLE_FONT, SUBTITLE_FONT
+
+    # Escribe el libro a partir del modelo y conserva la geometria para repintar solo algunas franjas despues
     workbook = openpyxl.Workbook()
     sheet = workbook.active
     sheet.title = 'Programación de Vuelos QT'
@@ -35,93 +149,748 @@ def process_and_plot(df, additional_text):
     # Escribir el título y el texto adicional
     sheet.merge_cells('B1:AX1')
     sheet['B1'] = 'PROGRAMACION DE VUELOS Y TRIPULACIONES'
-    sheet['B1'].alignment = Alignment(horizontal='center', vertical='center')
-    sheet['B1'].font = Font(size=22, bold=True)
+    sheet['B1'].alignment = CENTER
+    sheet['B1'].font = TITLE_FONT
 
     sheet.merge_cells('B2:AX2')
     sheet['B2'] = additional_text
-    sheet['B2'].alignment = Alignment(horizontal='center', vertical='center')
-    sheet['B2'].font = Font(size=22, italic=True)
-
-    start_time = df['fecha_salida'].min().floor('H')
-    end_time = df['fecha_llegada'].max().ceil('H')
-    num_columns = int((end_time - start_time).total_seconds() / 900) + 1
-
-    fill_blue = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-    fill_yellow = PatternFill(start_color="FFFFE0", end_color="FFFFE0", fill_type="solid")
-    medium_border = Border(left=Side(style='medium'),
-                           right=Side(style='medium'),
-                           top=Side(style='medium'),
-                           bottom=Side(style='medium'))
-
-    current_row_offsets = {'N330QT': 0, 'N331QT': 10, 'N332QT': 20, 'N334QT': 30, 'N335QT': 40, 'N336QT': 50, 'N337QT': 60}
-    base_row = 6
-    for aeronave in order:
-        vuelos_aeronave = df[df['aeronave'] == aeronave]
-        if vuelos_aeronave.empty:
-            continue
+    sheet['B2'].alignment = CENTER
+    sheet['B2'].font = SUBTITLE_FONT
 
-        for _, vuelo in vuelos_aeronave.iterrows():
-            start = vuelo['fecha_salida']
-            end = vuelo['fecha_llegada']
-            duration = end - start
-            duration_minutes = duration.total_seconds() / 60
-            start_col = 2 + int((start - start_time).total_seconds() / 900)
-            end_col = start_col + int(duration_minutes / 15)
+    # Las franjas de la flota crecen con los carriles de vuelos solapados
+    fleet = fleet.with_lanes(model.layout['lanes_per_tail'], LANE_HEIGHT, 1)
+    place_rows(model.layout, fleet.band_start, LANE_HEIGHT)
+    paint_flights(sheet, model, range(len(model)))
 
-            offset = current_row_offsets.get(aeronave, 0)
-            current_row = base_row + offset
+    sheet.sheet_view.zoomScale = 65
+    fill_empty(sheet, model, range(len(model)), fleet.first_row, fleet.last_row)
 
-            for col in range(start_col, end_col + 1):
-                sheet.cell(row=current_row + 1, column=col).fill = fill_blue
-                sheet.cell(row=current_row + 2, column=col).fill = fill_blue
-                sheet.cell(row=current_row + 3, column=col).fill = fill_yellow
+    write_conflict_sheet(workbook, model.conflicts)
 
-            mid_col = start_col + (end_col - start_col) // 2
-            sheet.cell(row=current_row + 2, column=mid_col).value = vuelo['Flight']
-            sheet.cell(row=current_row + 2, column=mid_col).alignment = Alignment(horizontal='center', vertical='center')
-            sheet.cell(row=current_row + 2, column=mid_col).font = Font(bold=True)
+    return {
+        'workbook': workbook,
+        'model': model,
+        'fleet': fleet,
+    }
 
-            sheet.merge_cells(start_row=current_row + 4, start_column=start_col, end_row=current_row + 4, end_column=end_col)
-            sheet.cell(row=current_row + 4, column=start_col).value = vuelo['Notas']
-            sheet.cell(row=current_row + 4, column=start_col).alignment = Alignment(horizontal='center', vertical='center')
+def write_schedule_stream(model, additional_text, fleet=MAIN_FLEET):
+    # Mismo contenido que write_schedule + fill_empty, pero en un libro de solo escritura: las filas
+    # se emiten en orden y openpyxl las pasa a un temporal. Como en fill_empty, el fondo blanco va en
+    # el estilo de fila y solo se escriben las celdas de los vuelos
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.worksheet.cell_range import CellRange
+    from conflicts import write_conflict_sheet
+    from layout import place_rows
+    from styles import FILL_BLUE, FILL_WHITE, CENTER, FLIGHT_LABEL_FONT, TITLE_FONT, SUBTITLE_FONT
 
-            sheet.merge_cells(start_row=current_row + 5, start_column=start_col, end_row=current_row + 5, end_column=end_col)
-            sheet.cell(row=current_row + 5, column=start_col).value = vuelo['Crew']
-            sheet.cell(row=current_row + 5, column=start_col).alignment = Alignment(horizontal='center', vertical='center')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Programación de Vuelos QT')
+    sheet.sheet_view.zoomScale = 65
 
-            sheet.merge_cells(start_row=current_row + 6, start_column=start_col, end_row=current_row + 6, end_column=end_col)
-            sheet.cell(row=current_row + 6, column=start_col).value = vuelo['Tripadi']
-            sheet.cell(row=current_row + 6, column=start_col).alignment = Alignment(horizontal='center', vertical='center')
+    fleet = fleet.with_lanes(model.layout['lanes_per_tail'], LANE_HEIGHT, 1)
+    place_rows(model.layout, fleet.band_start, LANE_HEIGHT)
 
-    sheet.sheet_view.zoomScale = 65
-    for row in range(base_row, base_row + 70):
-        for col in range(2, 2 + num_columns):
-            cell = sheet.cell(row=row, column=col)
-            if cell.value is None:
-                cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+    # Celdas de los vuelos por fila: columna -> (valor, relleno si tiene valor, fuente); sin etiqueta van en blanco
+    cells_by_row = {}
+    for row, col in flight_cells(model, range(len(model))):
+        cells_by_row.setdefault(row, {})[col] = None
+    texts = [model.labels['notas'], model.labels['crew'], model.labels['tripadi']]
+    starts = model.layout['start_col'].tolist()
+    ends = model.layout['end_col'].tolist()
+    mids = model.layout['mid_col'].tolist()
+    rows = model.layout['row'].tolist()
+    merges = []
+    for i, flight in enumerate(model.labels['flight']):
+        cells_by_row[rows[i] + 2][mids[i]] = (flight, FILL_BLUE, FLIGHT_LABEL_FONT)
+        for k, values in enumerate(texts):
+            cells_by_row[rows[i] + 4 + k][starts[i]] = (values[i], None, None)
+            merges.append(CellRange(min_col=starts[i], min_row=rows[i] + 4 + k, max_col=ends[i], max_row=rows[i] + 4 + k))
+    # Como en merge_label: se agregan de una vez al conjunto, sin que merged_cells.add busque cada
+    # rango entre todos los anteriores (cuadratico en la cantidad de vuelos)
+    sheet.merged_cells.ranges.update(merges)
 
+    for row, text, font in ((1, 'PROGRAMACION DE VUELOS Y TRIPULACIONES', TITLE_FONT), (2, additional_text, SUBTITLE_FONT)):
+        cell = WriteOnlyCell(sheet, text)
+        cell.alignment = CENTER
+        cell.font = font
+        sheet.append([None, cell])
+        sheet.merged_cells.add(f'B{row}:AX{row}')
+    for _ in range(3, fleet.first_row):
+        sheet.append([])
+
+    for row in range(fleet.first_row, fleet.last_row + 1):
+        sheet.row_dimensions[row].fill = FILL_WHITE
+        labels = cells_by_row.get(row)
+        if not labels:
+            sheet.append([])
+            continue
+        cells = [None] * max(labels)
+        for col, label in labels.items():
+            if label is None:
+                cell = WriteOnlyCell(sheet)
+                cell.fill = FILL_WHITE
+            else:
+                value, fill, font = label
+                cell = WriteOnlyCell(sheet, value)
+                cell.alignment = CENTER
+                if font is not None:
+                    cell.font = font
+                if value is None:
+                    cell.fill = FILL_WHITE
+                elif fill is not None:
+                    cell.fill = fill
+            cells[col - 1] = cell
+        sheet.append(cells)
+
+    write_conflict_sheet(workbook, model.conflicts)
+    return workbook
+
+def build_schedule(df, additional_text):
+    from schedule_model import ScheduleModel
+
+    df, error = prepare_schedule(df)
+    if error:
+        return None, error
+    schedule = write_schedule(ScheduleModel(df, MAIN_FLEET.order), additional_text)
+    schedule['df'] = df
+    return schedule, None
+
+def save_workbook(workbook):
     buf = io.BytesIO()
     workbook.save(buf)
     buf.seek(0)
+    return buf
+
+def spool_workbook(workbook):
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
+
+def iter_spool(spool):
+    try:
+        while True:
+            chunk = spool.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
 
+def process_and_plot(df, additional_text, timings=None, spool=False):
+    from schedule_model import ScheduleModel
+
+    # timings (opcional) recibe la duracion de cada etapa en segundos
+    with stage(timings, 'parse'):
+        df, error = prepare_schedule(df)
+    if error:
+        return None, error
+    with stage(timings, 'layout'):
+        model = ScheduleModel(df, MAIN_FLEET.order)
+    with stage(timings, 'write'):
+        workbook = write_schedule_stream(model, additional_text) if spool else write_schedule(model, additional_text)['workbook']
+    with stage(timings, 'save'):
+        buf = spool_workbook(workbook) if spool else save_workbook(workbook)
     return buf, None
 
+def clear_band(sheet, model, indices, first_row, last_row):
+    # Borra los vuelos anteriores de la franja: sus celdas se eliminan y vuelven al fondo blanco de la
+    # fila, como en un libro recien escrito. Las combinaciones de la franja se quitan de una vez
+    # (unmerge_cells busca cada rango en toda la hoja)
+    band = {merged for merged in sheet.merged_cells.ranges if merged.min_row >= first_row and merged.max_row <= last_row}
+    sheet.merged_cells.ranges -= band
+    for row, col in flight_cells(model, indices):
+        sheet._cells.pop((row, col), None)
+
+def update_schedule(session, upserts, deletes, additional_text):
+    import numpy as np
+    import pandas as pd
+    from conflicts import CONFLICT_SHEET_TITLE, write_conflict_sheet
+    from ingest import with_dates
+    from layout import place_rows
+
+    # Aplica filas insertadas/actualizadas/borradas y recalcula y repinta solo las franjas de las aeronaves
+    # afectadas. Si cambia el rango horario o la altura de alguna franja se reconstruye el libro completo.
+    changed = set(upserts) | set(deletes)
+    new_rows = pd.read_json(io.StringIO(json.dumps(list(upserts.values())))) if upserts else pd.DataFrame()
+    new_rows.index = list(upserts.keys())
+    if len(new_rows):
+        # Mismo año de referencia que la tabla de la sesion
+        new_rows, error = with_dates(new_rows)
+        if error:
+            return error
+    raw = session.df if session.df is not None else pd.DataFrame()
+    # Las filas actualizadas conservan su lugar en la tabla y las nuevas van al final, así el orden
+    # dentro de cada aeronave (y con el los carriles) es el de una tabla completa enviada de nuevo
+    kept = raw.index[~raw.index.isin(set(deletes) - set(upserts))]
+    row_ids = list(kept) + [row_id for row_id in new_rows.index if row_id not in raw.index]
+    session.df = pd.concat([raw[~raw.index.isin(changed)], new_rows]).loc[row_ids]
+    session.additional_text = additional_text
+
+    schedule = session.schedule
+    if schedule is None:
+        schedule, error = build_schedule(session.df.copy(), additional_text)
+        session.schedule = schedule
+        return error
+
+    order = MAIN_FLEET.order
+    previous = schedule['df']
+    affected = set(previous.loc[previous.index.isin(changed), 'Reg.'])
+    if len(new_rows):
+        parsed, error = parse_schedule(new_rows.copy())
+        if error:
+            return error
+        parsed['aeronave'] = pd.Categorical(parsed['Reg.'], categories=order, ordered=True)
+        affected.update(parsed['Reg.'])
+        df = pd.concat([previous[~previous.index.isin(changed)], parsed])
+    else:
+        df = previous[~previous.index.isin(changed)]
+    position = pd.Series(np.arange(len(session.df)), index=session.df.index)
+    df = df.iloc[np.argsort(position.loc[df.index].to_numpy(), kind='stable')]
+
+    missing_aircraft = MAIN_FLEET.missing_tails(df['Reg.'].unique())
+    if missing_aircraft:
+        return f"Favor ingresar contenido para las matriculas faltantes: {', '.join(missing_aircraft)}"
+
+    previous_model = schedule['model']
+    if (df['fecha_salida'].min().floor('H') != previous_model.start_time
+            or df['fecha_llegada'].max().ceil('H') != previous_model.end_time):
+        schedule, error = build_schedule(session.df.copy(), additional_text)
+        session.schedule = schedule
+        return error
+    tails = sorted(MAIN_FLEET.index[reg] for reg in affected if reg in MAIN_FLEET.index)
+    model = previous_model.replace_tails(df[df['Reg.'].isin(affected)], tails)
+    fleet = MAIN_FLEET.with_lanes(model.layout['lanes_per_tail'], LANE_HEIGHT, 1)
+    if not np.array_equal(fleet.band_start, schedule['fleet'].band_start):
+        schedule, error = build_schedule(session.df.copy(), additional_text)
+        session.schedule = schedule
+        return error
+    place_rows(model.layout, fleet.band_start, LANE_HEIGHT)
+
+    workbook = schedule['workbook']
+    sheet = workbook.worksheets[0]
+    for t in tails:
+        first_row, last_row = int(fleet.band_start[t]), int(fleet.band_end[t])
+        clear_band(sheet, previous_model, previous_model.tail_range(t), first_row, last_row)
+        paint_flights(sheet, model, model.tail_range(t))
+        fill_empty(sheet, model, model.tail_range(t), first_row, last_row)
+
+    sheet['B2'] = additional_text
+    if CONFLICT_SHEET_TITLE in workbook.sheetnames:
+        del workbook[CONFLICT_SHEET_TITLE]
+    write_conflict_sheet(workbook, model.conflicts)
+    schedule.update(df=df, model=model, fleet=fleet)
+    return None
+
+def session_table(payload, columnar, row_ids):
+    # Tabla de una sesion: una fila por identificador del cliente y las fechas ya convertidas
+    from ingest import with_dates
+
+    df, error = read_table(payload, columnar)
+    if error:
+        return None, error
+    if len(row_ids) != len(df):
+        return None, 'row_ids must have one id per row'
+    df.index = [str(row_id) for row_id in row_ids]
+    return with_dates(df)
+
+def render_session(payload, additional_text, columnar, row_ids):
+    # Como render_excel, pero devuelve ((bytes, horario), error): la sesion creada junto con el
+    # trabajo toma ese horario y el primer cambio no vuelve a generar el libro
+    df, error = session_table(payload, columnar, row_ids)
+    if error:
+        return None, error
+    schedule, error = build_schedule(df, additional_text)
+    if error:
+        return None, error
+    return (save_workbook(schedule['workbook']).getvalue(), schedule), None
+
+def load_session(session):
+    from sheets import rebind_dimensions
+
+    # La sesion de un trabajo toma el horario que armo ese trabajo; si aun no termino o fallo,
+    # la tabla guardada se lee aqui
+    if session.pending is None:
+        return None
+    job_id, payload, columnar, row_ids = session.pending
+    session.pending = None
+    status = job_queue.status(job_id)
+    if status is not None and status[0] == 'done':
+        schedule = status[1][1]
+        rebind_dimensions(schedule['workbook'])
+        session.df, session.schedule = schedule['df'], schedule
+        return None
+    df, error = session_table(payload, columnar, row_ids)
+    if error:
+        return error
+    session.df = df
+    session.schedule, error = build_schedule(df.copy(), session.additional_text)
+    return error
+
+def read_table(payload, columnar=False):
+    import pandas as pd
+    from ingest import parse_columns
+
+    if columnar:
+        return parse_columns(payload)
+    try:
+        return pd.read_json(io.StringIO(payload)), None
+    except ValueError as e:
+        return None, f"JSON parsing error: {e}"
+
+def table_payload(form):
+    # Prefiere el formato columnar compacto; 'table_data' (lista de filas) sigue aceptándose
+    if 'table_columns' in form:
+        return form['table_columns'], True
+    return form['table_data'], False
+
+def render_excel(payload, additional_text, columnar=False, timings=None, spool=False):
+    # Punto de entrada de los procesos del pool: recibe el JSON crudo y devuelve (bytes, error).
+    # Con spool=True devuelve el archivo temporal ya rebobinado en lugar de los bytes
+    with stage(timings, 'read_json'):
+        df, error = read_table(payload, columnar)
+    if error:
+        return None, error
+    excel, error = process_and_plot(df, additional_text, timings, spool)
+    if error:
+        return None, error
+    return (excel if spool else excel.getvalue()), None
+
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def send_excel(data, etag=False):
+    return send_file(io.BytesIO(data), as_attachment=True, download_name='programacion_vuelos_qt.xlsx', mimetype=XLSX_MIMETYPE, etag=etag)
+
+
+def stream_excel(spool, etag):
+    size = spool.seek(0, io.SEEK_END)
+    spool.seek(0)
+    return Response(iter_spool(spool), mimetype=XLSX_MIMETYPE, headers={
+        'Content-Disposition': 'attachment; filename=programacion_vuelos_qt.xlsx',
+        'Content-Length': str(size),
+        'ETag': f'"{etag}"',
+    })
+
+
+
+# Formatos de /render; todos se generan desde el mismo ScheduleModel
+RENDER_MIMETYPES = {
+    'xlsx': XLSX_MIMETYPE,
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'html': 'text/html',
+}
+
+
+def render_model(model, additional_text, fmt, fleet=MAIN_FLEET):
+    if fmt == 'xlsx':
+        return save_workbook(write_schedule(model, additional_text, fleet)['workbook']).getvalue()
+    if fmt in ('pdf', 'png'):
+        from gantt_pdf import render_gantt
+        return render_gantt(model, additional_text, fmt, bar_color='lightblue')[0].getvalue()
+    from gantt_svg import render_html, render_svg
+    if fmt == 'svg':
+        return render_svg(model, additional_text).encode('utf-8')
+    return render_html(model, additional_text).encode('utf-8')
+
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        table_data = request.form['table_data']
+        payload, columnar = table_payload(request.form)
         additional_text = request.form.get('additional_text')
+
+        # Las tablas repetidas se sirven desde la cache sin volver a generar el archivo
+        etag = cache_key(payload, additional_text)
+        cached = render_cache.get(etag)
+        if cached is not None:
+            if etag in request.if_none_match:
+                return Response(status=304, headers={'ETag': f'"{etag}"'})
+            return send_excel(cached, etag)
+
+        # Tiempos por etapa solo si hay métricas o cabecera de tiempos; si no, no se mide nada
+        timings = {} if request_metrics.enabled or timing_header else None
+        if stream_responses or request.form.get('stream') == '1':
+            # Sin copia en memoria del archivo: no pasa por la cache
+            with measure_peak_memory() as peak:
+                spool, error = render_excel(payload, additional_text, columnar, timings, spool=True)
+            if error:
+                return jsonify({'error': error}), 400
+            response = stream_excel(spool, etag)
+            # Solo si el pico es de esta peticion (sin otra generacion a la vez). X-Peak-RSS es el pico de
+            # RSS del proceso mientras se genero (Linux); X-Peak-Memory, lo reservado por Python, solo
+            # con tracemalloc activo (PYTHONTRACEMALLOC=1)
+            if peak['rss'] is not None:
+                response.headers['X-Peak-RSS'] = str(peak['rss'])
+            if peak['bytes'] is not None:
+                response.headers['X-Peak-Memory'] = str(peak['bytes'])
+        else:
+            # Tambien se registra para que un streaming simultaneo sepa que su pico no es solo suyo
+            with measure_peak_memory():
+                data, error = render_excel(payload, additional_text, columnar, timings)
+            if error:
+                return jsonify({'error': error}), 400
+            render_cache.put(etag, data)
+            response = send_excel(data, etag)
+        if request_metrics.enabled:
+            request_metrics.observe_stages(timings)
+        if timing_header:
+            response.headers['Server-Timing'] = format_timings(timings)
+        return response
+    return render_template('index.html')
+
+
+@app.route('/preview', methods=['POST'])
+def preview():
+    # Vista previa mientras se edita la tabla: mismo calculo de carriles que el xlsx, sin libro de openpyxl.
+    # Las aeronaves cuyas filas no cambiaron se toman de preview_cache. format=svg (por defecto) o json
+    from gantt_svg import render_svg
+    from ingest import with_dates
+    from preview import build_preview, preview_json
+
+    fmt = request.form.get('format', 'svg')
+    if fmt not in ('svg', 'json'):
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    timings = {}
+    with stage(timings, 'read_json'):
+        df, error = read_table(*table_payload(request.form))
+        if not error:
+            df, error = with_dates(df)
+    if error:
+        return jsonify({'error': error}), 400
+    with stage(timings, 'layout'):
+        model = build_preview(df, MAIN_FLEET.order, preview_cache)
+    with stage(timings, 'render'):
+        if fmt == 'svg':
+            response = Response(render_svg(model, request.form.get('additional_text')), mimetype='image/svg+xml')
+        else:
+            response = jsonify(preview_json(model))
+    if request_metrics.enabled:
+        request_metrics.observe_stages({f'preview_{name}': seconds for name, seconds in timings.items()})
+    if timing_header:
+        response.headers['Server-Timing'] = format_timings(timings)
+    return response
+
+
+@app.route('/conflicts', methods=['POST'])
+def conflicts():
+    # Reporte JSON de vuelos solapados por aeronave, sin generar el archivo
+    from schedule_model import ScheduleModel
+
+    df, error = read_table(*table_payload(request.form))
+    if error:
+        return jsonify({'error': error}), 400
+    df, error = parse_schedule(df)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'conflicts': ScheduleModel(df, MAIN_FLEET.order).conflicts})
+
+
+@app.route('/render', methods=['POST'])
+def render_schedule():
+    # Varios formatos de una misma tabla: se lee, valida y calcula la geometria una sola vez
+    from schedule_model import ScheduleModel
+
+    formats, error = requested_formats(request.values)
+    if error:
+        return jsonify({'error': error}), 400
+    additional_text = request.form.get('additional_text')
+    df, error = read_table(*table_payload(request.form))
+    if error:
+        return jsonify({'error': error}), 400
+    df, error = prepare_schedule(df)
+    if error:
+        return jsonify({'error': error}), 400
+    return send_rendered(ScheduleModel(df, MAIN_FLEET.order), additional_text, formats)
+
+
+def requested_formats(values):
+    formats = list(dict.fromkeys(f.strip().lower() for f in values.get('formats', 'xlsx').split(',') if f.strip()))
+    unsupported = [fmt for fmt in formats if fmt not in RENDER_MIMETYPES]
+    if not formats or unsupported:
+        return None, f"Unsupported format: {', '.join(unsupported) or 'none'}"
+    return formats, None
+
+
+def send_rendered(model, additional_text, formats, fleet=MAIN_FLEET):
+    # Un formato se envía tal cual; varios van juntos en un ZIP
+    if len(formats) == 1:
+        fmt = formats[0]
+        return send_file(io.BytesIO(render_model(model, additional_text, fmt, fleet)), as_attachment=True,
+                         download_name=f'programacion_vuelos_qt.{fmt}', mimetype=RENDER_MIMETYPES[fmt])
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for fmt in formats:
+            archive.writestr(f'programacion_vuelos_qt.{fmt}', render_model(model, additional_text, fmt, fleet))
+    buf.seek(0)
+    return send_file(buf, as_attachment=True, download_name='programacion_vuelos_qt.zip', mimetype='application/zip')
+
+
+@app.route('/store/flights', methods=['POST'])
+def store_flights():
+    # Guarda la tabla en la base para volver a generarla por rango de fechas sin subirla otra vez
+    from ingest import with_dates
+    from store import get_store
+
+    df, error = read_table(*table_payload(request.form))
+    if error:
+        return jsonify({'error': error}), 400
+    df, error = with_dates(df)
+    if error:
+        return jsonify({'error': error}), 400
+    df = df.dropna(subset=['fecha_salida', 'fecha_llegada'])
+    saved = get_store().save(df)
+    body = {'saved': saved}
+    if saved:
+        body.update(first_departure=df['fecha_salida'].min().isoformat(), last_departure=df['fecha_salida'].max().isoformat())
+    return jsonify(body), 201
+
+
+@app.route('/store/render')
+def store_render():
+    # Genera directamente desde la base: ?start=2024-10-01&end=2024-10-08 (fin excluido),
+    # &tails=N330QT,N331QT opcional y &formats= como en /render
+    import pandas as pd
+    from schedule_model import ScheduleModel
+    from store import get_store
+
+    missing = [name for name in ('start', 'end') if not request.args.get(name)]
+    if missing:
+        return jsonify({'error': f"Missing parameter: {', '.join(missing)}"}), 400
+    try:
+        start = pd.Timestamp(request.args['start'])
+        end = pd.Timestamp(request.args['end'])
+    except ValueError as e:
+        return jsonify({'error': f"Date conversion error: {e}"}), 400
+    tails = [t.strip() for t in request.args.get('tails', '').split(',') if t.strip()]
+    unknown = [t for t in tails if t not in MAIN_FLEET.index]
+    if unknown:
+        return jsonify({'error': f"Unknown tails: {', '.join(unknown)}"}), 400
+    formats, error = requested_formats(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    fleet = MAIN_FLEET.subset(tails) if tails else MAIN_FLEET
+
+    df = get_store().query(start, end, fleet.order)
+    if df.empty:
+        return jsonify({'error': 'No stored flights in the requested range'}), 404
+    df, error = prepare_schedule(df, fleet)
+    if error:
+        return jsonify({'error': error}), 400
+    return send_rendered(ScheduleModel(df, fleet.order), request.args.get('additional_text'), formats, fleet)
+
+
+@app.route('/roster', methods=['POST'])
+def roster():
+    # Rol por tripulante (Crew y Tripadi) en un solo libro, o su resumen en JSON con format=json
+    from crew import CrewRoster, write_roster
+
+    df, error = read_table(*table_payload(request.form))
+    if error:
+        return jsonify({'error': error}), 400
+    df, error = parse_schedule(df)
+    if error:
+        return jsonify({'error': error}), 400
+    df = df.reset_index(drop=True)
+    crew_roster = CrewRoster(df)
+    if request.form.get('format') == 'json':
+        flights = df['Flight'].where(df['Flight'].notna(), None).tolist()
+        summary = crew_roster.summary()
+        for item, positions in zip(summary, crew_roster.index().values()):
+            item['flights'] = [flights[p] for p in positions.tolist()]
+        return jsonify({'crew': summary})
+    data = save_workbook(write_roster(df, crew_roster, request.form.get('additional_text'))).getvalue()
+    return send_file(io.BytesIO(data), as_attachment=True, download_name='roles_tripulacion_qt.xlsx', mimetype=XLSX_MIMETYPE)
+
+
+def batch_items(body):
+    # Cada elemento es (nombre del archivo, argumentos de render_excel)
+    from ingest import OPTIONAL_COLUMNS, REQUIRED_COLUMNS
+
+    text = body.get('additional_text')
+    if body.get('split_by_date'):
+        columnar = 'table_columns' in body
+        payload = body['table_columns'] if columnar else body['table_data']
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        df, error = read_table(payload, columnar)
+        if error:
+            return None, error
+        df, error = parse_schedule(df)
+        if error:
+            return None, error
+        items = []
+        for day, group in df.groupby(df['fecha_salida'].dt.normalize(), sort=True):
+            columns = {name: group[name].astype(object).where(group[name].notna(), None).tolist()
+                       for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in group}
+            items.append((f"programacion_vuelos_qt_{day:%d%b}.xlsx", (json.dumps({'columns': columns}), text, True)))
+        return items, None
+
+    items = []
+    for i, item in enumerate(body.get('items', [])):
+        columnar = 'table_columns' in item
+        payload = item.get('table_columns') if columnar else item.get('table_data')
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        name = item.get('name') or f"programacion_vuelos_qt_{i + 1:02d}.xlsx"
+        items.append((name, (payload, item.get('additional_text', text), columnar)))
+    return items, None
+
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    # Varios horarios en paralelo; el ZIP se envía por partes a medida que terminan
+    body = request.get_json(silent=True)
+    if body is None:
+        return jsonify({'error': 'JSON parsing error: expected a JSON body'}), 400
+    try:
+        items, error = batch_items(body)
+    except KeyError as e:
+        error = f"Missing field in batch request: {e}"
+    if error:
+        return jsonify({'error': error}), 400
+    if not items:
+        return jsonify({'error': 'Empty batch'}), 400
+    return Response(stream_zip(render_excel, items), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=programacion_vuelos_qt.zip'})
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # Con row_ids (un id por fila de la tabla) se abre tambien una sesion sobre la misma tabla: el
+    # cliente envia la tabla una sola vez y despues solo los cambios
+    payload, columnar = table_payload(request.form)
+    additional_text = request.form.get('additional_text')
+    row_ids = None
+    if 'row_ids' in request.form:
         try:
-            df = pd.read_json(table_data)
+            row_ids = json.loads(request.form['row_ids'])
         except ValueError as e:
             return jsonify({'error': f"JSON parsing error: {e}"}), 400
+    try:
+        if row_ids is None:
+            job_id = job_queue.submit(render_excel, payload, additional_text, columnar)
+        else:
+            job_id = job_queue.submit(render_session, payload, additional_text, columnar, row_ids)
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    body = {'job_id': job_id, 'status_url': f'/jobs/{job_id}', 'download_url': f'/jobs/{job_id}/download'}
+    if row_ids is not None:
+        body['session_id'] = session_store.create(None, additional_text, pending=(job_id, payload, columnar, row_ids))
+    return jsonify(body), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    state, _, error = status
+    body = {'job_id': job_id, 'status': state}
+    if error:
+        body['error'] = error
+    return jsonify(body)
+
 
-        excel, error = process_and_plot(df, additional_text)
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    state, result, error = status
+    if state == 'failed':
+        return jsonify({'error': error}), 400
+    if state != 'done':
+        return jsonify({'job_id': job_id, 'status': state}), 409
+    # Los trabajos que abren una sesion devuelven (bytes, horario)
+    data = result[0] if isinstance(result, tuple) else result
+    return send_excel(data, job_id)
+
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    # Guarda la tabla completa con los identificadores de fila del cliente y genera el libro de una vez,
+    # así el primer cambio ya solo repinta las franjas afectadas
+    try:
+        row_ids = json.loads(request.form['row_ids'])
+    except ValueError as e:
+        return jsonify({'error': f"JSON parsing error: {e}"}), 400
+    additional_text = request.form.get('additional_text')
+    df, error = session_table(*table_payload(request.form), row_ids)
+    if error:
+        return jsonify({'error': error}), 400
+    schedule, error = build_schedule(df.copy(), additional_text)
+    if error:
+        return jsonify({'error': error}), 400
+    session_id = session_store.create(df, additional_text, schedule)
+    return jsonify({'session_id': session_id}), 201
+
+
+@app.route('/sessions/<session_id>/delta', methods=['POST'])
+def session_delta(session_id):
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    delta = request.get_json(silent=True)
+    if delta is None:
+        return jsonify({'error': 'JSON parsing error: expected a JSON body'}), 400
+    upserts = {str(row_id): row for row_id, row in delta.get('upsert', {}).items()}
+    deletes = [str(row_id) for row_id in delta.get('delete', [])]
+    with session.lock:
+        try:
+            error = load_session(session) or update_schedule(session, upserts, deletes,
+                                                             delta.get('additional_text', session.additional_text))
+        except ValueError as e:
+            error = f"JSON parsing error: {e}"
         if error:
+            session.schedule = None
             return jsonify({'error': error}), 400
-        return send_file(excel, as_attachment=True, download_name='programacion_vuelos_qt.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    return render_template('index.html')
+        data = save_workbook(session.schedule['workbook']).getvalue()
+    return send_excel(data)
+
+
+@app.after_request
+def record_request(response):
+    if request_metrics.enabled and request.endpoint != 'metrics':
+        output_bytes = response.content_length if response.status_code == 200 else None
+        request_metrics.observe_request(request.endpoint, response.status_code, request.content_length, output_bytes)
+        if response.status_code == 400 and response.is_json:
+            request_metrics.observe_error((response.get_json(silent=True) or {}).get('error', ''))
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    if not request_metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(dict(render_cache.stats(), preview=preview_cache.stats()))
+
+
+def warm_up():
+    # Carga las dependencias y genera un horario minimo en xlsx y PDF antes de recibir trafico.
+    # Los procesos de trabajos y lotes se crean despues por fork y heredan todo lo ya cargado.
+    import pandas as pd
+    from schedule_model import ScheduleModel
+
+    df = pd.DataFrame(tiny_schedule(MAIN_FLEET.order))
+    process_and_plot(df.copy(), 'warm-up')
+    df, error = prepare_schedule(df)
+    if not error:
+        render_model(ScheduleModel(df, MAIN_FLEET.order), 'warm-up', 'pdf')
+
+
+if warmup_from_env():
+    warm_up()
+
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -1,14 +1,77 @@
 from flask import Flask, render_template, request, send_file, jsonify
-import pandas as pd
-import openpyxl
-from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
-from openpyxl.utils import get_column_letter
 import io
 import os
 
+from fleet import FLEET
+from skeleton import skeleton_cache_from_env, skeleton_key
+from startup import tiny_schedule, warmup_from_env
+from writers import WRITER_BACKENDS, new_writer, writer_backend_from_env
+
 app = Flask(__name__)
+skeleton_cache = skeleton_cache_from_env()
+
+# Filas que ocupa cada carril de vuelos (tres de franja y una combinada debajo)
+LANE_HEIGHT = 4
+
+# Horizonte del libro: 'single' pone todo el rango en una hoja; 'daily' arma una hoja por dia de
+# operacion, que empieza en DAY_CUTOFF (la misma hora que marca la línea roja). El formulario puede
+# elegirlo por solicitud con horizon=single|daily
+HORIZON_MODES = ('single', 'daily')
+HORIZON_MODE = os.environ.get('HORIZON_MODE', 'single')
+_cutoff_hours, _cutoff_minutes = (int(part) for part in os.environ.get('DAY_CUTOFF', '05:00').split(':'))
+DAY_CUTOFF = f'{_cutoff_hours:02d}:{_cutoff_minutes:02d}'
+DAY_CUTOFF_MINUTES = 60 * _cutoff_hours + _cutoff_minutes
+
+# Backend del xlsx (XLSX_WRITER=openpyxl|stream); los dos dan la misma hoja
+XLSX_WRITER = writer_backend_from_env()
+
+def build_frame(fleet, num_columns, backend):
+    # Parte del libro que no depende de los vuelos: se arma una vez por flota y cantidad de columnas
+    from styles import (FILL_LIGHT_GRAY, CENTER, TITLE_FONT, SUBTITLE_FONT, TAIL_LABEL_FONT, TAIL_LABEL_ALIGNMENT,
+                        BAND_EDGE_BORDER, BAND_INNER_BORDER, BAND_SEPARATOR_BORDER, TIME_AXIS_BORDER)
+
+    writer = new_writer(backend)
+    sheet = writer.add_sheet('Programación de Vuelos QT')
+
+    # Escribir el título; el texto adicional se escribe en B2 con cada solicitud
+    sheet.merge(1, 2, 1, 50)
+    sheet.cell(1, 2, 'PROGRAMACION DE VUELOS Y TRIPULACIONES', alignment=CENTER, font=TITLE_FONT)
+
+    sheet.merge(2, 2, 2, 50)
+    sheet.cell(2, 2, alignment=CENTER, font=SUBTITLE_FONT)
+
+    # Ancho de las columnas desde B: una sola definicion para todo el rango de horas.
+    # La columna B lleva ademas la línea vertical negra como estilo de columna
+    sheet.columns(2, 2, 2.5, border=TIME_AXIS_BORDER)
+    if num_columns > 1:
+        sheet.columns(3, 1 + num_columns, 2.5)
+
+    # Combinar celdas y formato de la columna A
+    separator_rows = set(fleet.separator_rows)
+    for i, (start_row, end_row) in enumerate(zip(fleet.band_start.tolist(), fleet.band_end.tolist())):
+        sheet.merge(start_row, 1, end_row, 1)
+        sheet.cell(start_row, 1, fleet.order[i], alignment=TAIL_LABEL_ALIGNMENT, font=TAIL_LABEL_FONT)
+
+        # Dibujar borde externo grueso en los rangos especificados (la primera fila lleva el separador)
+        for row in range(start_row, end_row + 1):
+            if row in separator_rows:
+                border = BAND_SEPARATOR_BORDER
+            else:
+                border = BAND_EDGE_BORDER if row in fleet.edge_rows else BAND_INNER_BORDER
+            sheet.cell(row, 1, border=border, fill=FILL_LIGHT_GRAY)
+
+    # Agregar líneas horizontales más gruesas como estilo de fila, sin crear las celdas
+    for row in fleet.separator_rows:
+        sheet.row_style(row, border=BAND_SEPARATOR_BORDER)
+
+    # Configurar el zoom del PDF al 65%
+    sheet.zoom = 65
+    return writer
+
+def parse_schedule(df):
+    # pandas y openpyxl se cargan con la primera solicitud (o con WARMUP=1 al iniciar)
+    import pandas as pd
 
-def process_and_plot(df, additional_text):
     try:
         df['fecha_salida'] = pd.to_datetime(df['STD'], format='%d%b %H:%M', dayfirst=True)
         df['fecha_llegada'] = pd.to_datetime(df['STA'], format='%d%b %H:%M', dayfirst=True)
@@ -18,158 +81,172 @@ def process_and_plot(df, additional_text):
         return None, f"Date conversion error: {e}"
 
     df = df.dropna(subset=['fecha_salida', 'fecha_llegada'])
-    order = ['N330QT', 'N331QT', 'N332QT', 'N334QT', 'N335QT', 'N336QT', 'N337QT']
-    df['aeronave'] = pd.Categorical(df['Reg.'], categories=order, ordered=True)
-    df = df.sort_values('aeronave', ascending=False)
-
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'Programación de Vuelos QT'
-
-    # Escribir el título y el texto adicional
-    sheet.merge_cells('B1:AX1')
-    sheet['B1'] = 'PROGRAMACION DE VUELOS Y TRIPULACIONES'
-    sheet['B1'].alignment = Alignment(horizontal='center', vertical='center')
-    sheet['B1'].font = Font(size=22, bold=True)
-
-    sheet.merge_cells('B2:AX2')
-    sheet['B2'] = additional_text
-    sheet['B2'].alignment = Alignment(horizontal='center', vertical='center')
-    sheet['B2'].font = Font(size=22, italic=True)
-
-    # Escribir la cabecera con horas completas en negrita y color vinotinto
-    start_time = df['fecha_salida'].min().floor('H')
-    end_time = df['fecha_llegada'].max().ceil('H')
-    num_columns = int((end_time - start_time).total_seconds() / 900) + 1  # 900 segundos = 15 minutos
-
-    hour_header = [''] * 1 + \
-                  [((start_time + pd.Timedelta(minutes=15 * i)).strftime('%H:%M') if (start_time + pd.Timedelta(minutes=15 * i)).minute == 0 else '') for i in range(num_columns)]
-    for col in range(len(hour_header)):
-        sheet.cell(row=5, column=col + 2).value = hour_header[col]
-        sheet.cell(row=5, column=col + 2).font = Font(bold=True, color="8B0000")  # Vinotinto
-        sheet.cell(row=5, column=col + 2).alignment = Alignment(horizontal='center', vertical='center')
-
-    # Ajustar el ancho de las columnas desde B
-    for col in range(2, 2 + num_columns):
-        sheet.column_dimensions[get_column_letter(col)].width = 2.5
-
-    # Formatos y rellenos
-    fill_blue = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-    fill_yellow = PatternFill(start_color="FFFFE0", end_color="FFFFE0", fill_type="solid")
-    fill_light_gray = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    medium_border = Border(left=Side(style='medium'),
-                           right=Side(style='medium'),
-                           top=Side(style='medium'),
-                           bottom=Side(style='medium'))
-    dashed_red_border = Border(left=Side(style='dashed', color='FF0000'))
-
-    # Combinar celdas y formato de la columna A
-    merge_ranges = [(6, 15), (16, 24), (25, 33), (34, 42), (43, 51), (52, 60), (61, 69)]
-    for i, (start_row, end_row) in enumerate(merge_ranges):
-        sheet.merge_cells(start_row=start_row, start_column=1, end_row=end_row, end_column=1)
-        cell = sheet.cell(row=start_row, column=1)
-        cell.value = order[i]
-        cell.alignment = Alignment(horizontal='center', vertical='center', text_rotation=90)
-        cell.font = Font(size=28, bold=True)
-
-        # Dibujar borde externo grueso en los rangos especificados
-        for row in range(start_row, end_row + 1):
-            sheet.cell(row=row, column=1).border = medium_border if row in {6, 15, 16, 24, 25, 33, 34, 42, 43, 51, 52, 60, 61, 69} else Border(left=Side(style='thin'))
-            sheet.cell(row=row, column=1).fill = fill_light_gray
-
-    # Línea vertical negra a la derecha de las celdas A5 a A69
-    for row in range(5, 70):
-        cell = sheet.cell(row=row, column=2)
-        cell.border = Border(left=Side(style='thick', color='000000'))
-
-    # Agregar líneas horizontales más gruesas
-    medium_horizontal_border = Border(top=Side(style='medium'))
-    for row in [6, 16, 25, 34, 43, 52, 61, 70]:  # Mover línea de 69 a 70
-        for col in range(1, sheet.max_column + 1):
-            cell = sheet.cell(row=row, column=col)
-            cell.border = medium_horizontal_border
-
-    # Agregar líneas verticales rojas en las columnas donde la hora es "05:00"
-    for col in range(2, 2 + num_columns):
-        if sheet.cell(row=5, column=col).value == "05:00":
-            for row in range(5, 70):
-                sheet.cell(row=row, column=col - 1).border = dashed_red_border
-
-    current_row_offsets = {'N331QT': 0, 'N332QT': -1, 'N334QT': -2, 'N335QT': -3, 'N336QT': -4, 'N337QT': -5}
-    base_row = 7  # Iniciar a partir de la fila 7
-
-    for aeronave in order:
-        vuelos_aeronave = df[df['aeronave'] == aeronave]
-        if vuelos_aeronave.empty:
-            continue
-
-        offset = current_row_offsets.get(aeronave, 0)
-        current_row = base_row + offset
-
-        row_data = [''] * (1 + num_columns)
-        sheet.append([''] * (1 + num_columns))
-        sheet.append([''] * (1 + num_columns))
-        sheet.append(row_data)
-
-        for _, vuelo in vuelos_aeronave.iterrows():
-            start = vuelo['fecha_salida']
-            end = vuelo['fecha_llegada']
-            duration = end - start
-            duration_minutes = duration.total_seconds() / 60
-            start_col = 2 + int((start - start_time).total_seconds() / 900)
-            end_col = start_col + int(duration_minutes / 15)
-
-            # Colorear las celdas de la franja horaria
-            for col in range(start_col, end_col + 1):
-                sheet.cell(row=current_row + 1, column=col).fill = fill_blue
-                sheet.cell(row=current_row + 2, column=col).fill = fill_blue
-                sheet.cell(row=current_row + 3, column=col).fill = fill_yellow
-
-            # Agregar un recuadro negro alrededor de toda la franja
-            for col in range(start_col, end_col + 1):
-                if col == start_col:
-                    sheet.cell(row=current_row + 1, column=col).border = Border(left=Side(style='medium'), top=Side(style='medium'))
-                    sheet.cell(row=current_row + 2, column=col).border = Border(left=Side(style='medium'))
-                    sheet.cell(row=current_row + 3, column=col).border = Border(left=Side(style='medium'), bottom=Side(style='medium'))
-                elif col == end_col:
-                    sheet.cell(row=current_row + 1, column=col).border = Border(right=Side(style='medium'), top=Side(style='medium'))
-                    sheet.cell(row=current_row + 2, column=col).border = Border(right=Side(style='medium'))
-                    sheet.cell(row=current_row + 3, column=col).border = Border(right=Side(style='medium'), bottom=Side(style='medium'))
-                else:
-                    sheet.cell(row=current_row + 1, column=col).border = Border(top=Side(style='medium'))
-                    sheet.cell(row=current_row + 3, column=col).border = Border(bottom=Side(style='medium'))
-
-            # Colocar el número de vuelo en la celda central de la franja y en negrita
-            mid_col = start_col + (end_col - start_col) // 2
-            sheet.cell(row=current_row + 2, column=mid_col).value = vuelo['Flight']
-            sheet.cell(row=current_row + 2, column=mid_col).alignment = Alignment(horizontal='center', vertical='center')
-            sheet.cell(row=current_row + 2, column=mid_col).font = Font(bold=True)
-
-            # Colocar el origen y la hora de salida en la primera celda de la franja
-            sheet.cell(row=current_row + 1, column=start_col).value = vuelo['From']
-            sheet.cell(row=current_row + 2, column=start_col).value = vuelo['fecha_salida'].strftime('%H:%M')
-
-            # Colocar el destino y la hora de llegada una celda antes y combinar con la siguiente celda
-            sheet.cell(row=current_row + 1, column=end_col - 1).value = vuelo['To']
-            sheet.cell(row=current_row + 1, column=end_col - 1).alignment = Alignment(horizontal='right')
-            sheet.merge_cells(start_row=current_row + 1, start_column=end_col - 1, end_row=current_row + 1, end_column=end_col)
-
-            sheet.cell(row=current_row + 2, column=end_col - 1).value = vuelo['fecha_llegada'].strftime('%H:%M')
-            sheet.cell(row=current_row + 2, column=end_col - 1).alignment = Alignment(horizontal='right')
-            sheet.merge_cells(start_row=current_row + 2, start_column=end_col - 1, end_row=current_row + 2, end_column=end_col)
-
-            # Crear una celda combinada debajo de la franja
-            sheet.merge_cells(start_row=current_row + 4, start_column=start_col, end_row=current_row + 4, end_column=end_col)
-
-        sheet.append([''] * (1 + num_columns))
-        sheet.append([''] * (1 + num_columns))
-        base_row += 10  # Mover a la siguiente fila base
-
-    # Configurar el zoom del PDF al 65%
-    sheet.sheet_view.zoomScale = 65
+    df['aeronave'] = pd.Categorical(df['Reg.'], categories=FLEET.order, ordered=True)
+    return df.sort_values('aeronave', ascending=False), None
+
+def write_sheet(df, additional_text, backend):
+    # Hoja de la programacion para los vuelos de df; devuelve el writer y el modelo
+    import numpy as np
+    import pandas as pd
+    from openpyxl.utils import get_column_letter
+    from layout import place_rows
+    from schedule_model import ScheduleModel
+    from styles import (FILL_BLUE, FILL_YELLOW, SLOT_START_BORDERS, SLOT_END_BORDERS, SLOT_INTERIOR_BORDERS,
+                        CENTER, RIGHT, FLIGHT_LABEL_FONT, TIME_LABEL_FONT, TIME_AXIS_BORDER, MARKER_0500_BORDER)
+
+    order = FLEET.order
+    model = ScheduleModel(df, order)
+    start_time = model.start_time
+    num_columns = model.num_columns
+
+    # Geometria de los vuelos; las franjas con vuelos solapados crecen para sus carriles extra
+    layout = model.layout
+    fleet = FLEET.with_lanes(layout['lanes_per_tail'], LANE_HEIGHT, 2)
+    place_rows(layout, fleet.band_start + 1, LANE_HEIGHT)
+
+    # El marco fijo (titulos, anchos y franjas de la columna A) sale de la cache; solo se escribe lo que cambia
+    writer = skeleton_cache.clone(skeleton_key(fleet, num_columns, backend), lambda: build_frame(fleet, num_columns, backend))
+    sheet = writer.sheets[0]
+    sheet.cell(2, 2, additional_text)
+
+    # Escribir la cabecera con horas completas en negrita y color vinotinto. Solo se escriben las horas
+    # completas (start_time cae en hora exacta); el resto de la fila 5 queda sin crear
+    for i in range(0, num_columns, 4):
+        label = (start_time + pd.Timedelta(minutes=15 * i)).strftime('%H:%M')
+        sheet.cell(5, i + 3, label, font=TIME_LABEL_FONT, alignment=CENTER)  # Vinotinto
+
+    # Agregar líneas verticales rojas antes de las columnas de la hora de corte (05:00 por defecto) con formato condicional.
+    # Se buscan entre todas las columnas de 15 minutos, no solo las de hora completa, asi un corte como
+    # 05:30 tambien lleva su linea; un corte que no cae en un cuarto de hora la lleva antes de su columna
+    start_minutes = start_time.hour * 60 + start_time.minute
+    slots = np.arange(num_columns)
+    at_cutoff = (start_minutes + 15 * slots - DAY_CUTOFF_MINUTES) % (24 * 60) < 15
+    marker_columns = (slots[at_cutoff] + 2).tolist()
+    if marker_columns:
+        ranges = ' '.join(f'{get_column_letter(col)}5:{get_column_letter(col)}{fleet.last_row}' for col in marker_columns)
+        sheet.conditional_border(ranges, MARKER_0500_BORDER)
+
+    flights = model.labels['flight']
+    origins = model.labels['origin']
+    destinations = model.labels['destination']
+    salidas = model.labels['std']
+    llegadas = model.labels['sta']
+    start_cols = layout['start_col'].tolist()
+    end_cols = layout['end_col'].tolist()
+    mid_cols = layout['mid_col'].tolist()
+    rows = layout['row'].tolist()
+
+    for j, (start_col, end_col, mid_col, current_row) in enumerate(zip(start_cols, end_cols, mid_cols, rows)):
+
+        # Colorear la franja horaria y dibujar el recuadro negro en una sola pasada
+        for col in range(start_col, end_col + 1):
+            if col == start_col:
+                borders = SLOT_START_BORDERS
+            elif col == end_col:
+                borders = SLOT_END_BORDERS
+            else:
+                borders = SLOT_INTERIOR_BORDERS
+            for k, fill in enumerate((FILL_BLUE, FILL_BLUE, FILL_YELLOW)):
+                sheet.cell(current_row + 1 + k, col, fill=fill, border=borders[k])
+
+        # Colocar el número de vuelo en la celda central de la franja y en negrita
+        sheet.cell(current_row + 2, mid_col, flights[j], alignment=CENTER, font=FLIGHT_LABEL_FONT)
+
+        # Colocar el origen y la hora de salida en la primera celda de la franja
+        sheet.cell(current_row + 1, start_col, origins[j])
+        sheet.cell(current_row + 2, start_col, salidas[j])
+
+        # Colocar el destino y la hora de llegada una celda antes y combinar con la siguiente celda
+        sheet.cell(current_row + 1, end_col - 1, destinations[j], alignment=RIGHT)
+        sheet.merge(current_row + 1, end_col - 1, current_row + 1, end_col)
+
+        sheet.cell(current_row + 2, end_col - 1, llegadas[j], alignment=RIGHT)
+        sheet.merge(current_row + 2, end_col - 1, current_row + 2, end_col)
+
+        # Crear una celda combinada debajo de la franja; si empieza en la columna B la celda ya existe
+        # y no toma el estilo de la columna, así que lleva la línea vertical negra propia
+        sheet.merge(current_row + 4, start_col, current_row + 4, end_col)
+        if start_col == 2:
+            sheet.cell(current_row + 4, 2, border=TIME_AXIS_BORDER)
+
+    return writer, model
+
+def write_conflicts(writer, report):
+    # Misma hoja que conflicts.write_conflict_sheet, escrita con el backend elegido
+    from conflicts import CONFLICT_HEADER, CONFLICT_SHEET_TITLE, conflict_rows
+    from styles import FLIGHT_LABEL_FONT
+
+    if not report:
+        return
+    sheet = writer.add_sheet(CONFLICT_SHEET_TITLE)
+    for col, title in enumerate(CONFLICT_HEADER, 1):
+        sheet.cell(1, col, title, font=FLIGHT_LABEL_FONT)
+    for row, values in enumerate(conflict_rows(report), 2):
+        for col, value in enumerate(values, 1):
+            sheet.cell(row, col, value)
+
+def day_writer(df, additional_text, backend):
+    # Punto de entrada de los procesos del pool: el writer viaja de vuelta con pickle
+    return write_sheet(df, additional_text, backend)[0]
+
+def operating_days(df):
+    # Dia de operacion de cada vuelo: el dia empieza en la hora de corte. Un vuelo que cruza el corte
+    # queda entero en la hoja del dia en que sale, y esa hoja se alarga hasta su llegada
+    import pandas as pd
+
+    return (df['fecha_salida'] - pd.Timedelta(minutes=DAY_CUTOFF_MINUTES)).dt.normalize()
+
+def write_daily(df, additional_text, backend):
+    # Una hoja por dia de operacion, armadas en paralelo en el pool de procesos y juntadas en el
+    # writer del primer dia. Los conflictos se calculan sobre todo el horario, así aparecen también
+    # los choques entre un vuelo que cruza el corte y los del dia siguiente
+    from concurrent.futures.process import BrokenProcessPool
+    from batch import discard_executor, submit
+    from conflicts import conflict_report
+    from layout import compute_layout
+
+    days = [(day, group) for day, group in df.groupby(operating_days(df), sort=True)]
+    pending = [submit(day_writer, group, additional_text, backend) for _, group in days]
+    writers = []
+    for (_, group), (future, executor) in zip(days, pending):
+        try:
+            writers.append(future.result())
+        except BrokenProcessPool:
+            # Murio un proceso del pool: se descarta el pool (el siguiente submit arma uno nuevo) y el
+            # dia se reintenta una vez
+            discard_executor(executor)
+            future, _ = submit(day_writer, group, additional_text, backend)
+            writers.append(future.result())
+
+    writer = writers[0]
+    title = writer.sheets[0].title
+    for (day, _), other in zip(days, writers):
+        other.sheets[0].title = f'{title} {day:%d%b}'
+    for other in writers[1:]:
+        writer.adopt(other)
+    layout = compute_layout(df, FLEET.order, df['fecha_salida'].min().floor('H'))
+    return writer, conflict_report(df, layout, FLEET.order)
+
+def process_and_plot(df, additional_text, horizon=None, backend=None):
+    df, error = parse_schedule(df)
+    if error:
+        return None, error
+
+    horizon = horizon or HORIZON_MODE
+    if horizon not in HORIZON_MODES:
+        return None, f"Unsupported horizon: {horizon}"
+    backend = backend or XLSX_WRITER
+    if backend not in WRITER_BACKENDS:
+        return None, f"Unsupported xlsx writer: {backend}"
+    if horizon == 'daily' and operating_days(df).nunique() > 1:
+        writer, conflicts = write_daily(df, additional_text, backend)
+    else:
+        writer, model = write_sheet(df, additional_text, backend)
+        conflicts = model.conflicts
+    write_conflicts(writer, conflicts)
 
     buf = io.BytesIO()
-    workbook.save(buf)
+    writer.save(buf)
     buf.seek(0)
 
     return buf, None
@@ -177,19 +254,30 @@ def process_and_plot(df, additional_text):
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
+        import pandas as pd
+
         table_data = request.form['table_data']
         additional_text = request.form.get('additional_text')
         try:
-            df = pd.read_json(table_data)
+            df = pd.read_json(io.StringIO(table_data))
         except ValueError as e:
             return jsonify({'error': f"JSON parsing error: {e}"}), 400
 
-        excel, error = process_and_plot(df, additional_text)
+        excel, error = process_and_plot(df, additional_text, request.form.get('horizon'))
         if error:
             return jsonify({'error': error}), 400
         return send_file(excel, as_attachment=True, download_name='programacion_vuelos_qt.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     return render_template('index.html')
 
+def warm_up():
+    # Importa pandas/openpyxl y genera un libro minimo antes de recibir trafico
+    import pandas as pd
+
+    process_and_plot(pd.DataFrame(tiny_schedule(FLEET.order)), 'warm-up')
+
+if warmup_from_env():
+    warm_up()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
@@ -1,7 +1,9 @@
 from flask import Flask, render_template, request, send_file
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
 import io
 import os
 
@@ -18,7 +20,9 @@ def process_and_plot(file, additional_text):
     order = ['N330QT', 'N331QT', 'N332QT', 'N334QT', 'N335QT', 'N336QT', 'N337QT']
     df['aeronave'] = pd.Categorical(df['aeronave'], categories=order, ordered=True)
     df = df.sort_values('aeronave', ascending=False)
-    fig, ax = plt.subplots(figsize=(20, 10))
+    # Figura propia por solicitud (sin el estado global de pyplot) para atender solicitudes en paralelo
+    fig = Figure(figsize=(20, 10))
+    ax = fig.add_subplot()
 
     for i, aeronave in enumerate(reversed(order)):
         vuelos_aeronave = df[df['aeronave'] == aeronave]
@@ -50,17 +54,16 @@ def process_and_plot(file, additional_text):
     ax.set_ylim(-1, len(order))
     ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
     ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-    plt.xticks(rotation=45, fontsize=10)
+    ax.tick_params(axis='x', labelrotation=45, labelsize=10)
     ax.set_xlim(df['fecha_salida'].min() - pd.Timedelta(hours=1), df['fecha_llegada'].max() + pd.Timedelta(hours=1))
-    plt.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.15)
-    plt.xlabel('Hora')
-    plt.ylabel('Aeronave')
-    plt.title(f'Programación de Vuelos QT {additional_text}')
+    fig.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.15)
+    ax.set_xlabel('Hora')
+    ax.set_ylabel('Aeronave')
+    ax.set_title(f'Programación de Vuelos QT {additional_text}')
 
     buf = io.BytesIO()
-    plt.savefig(buf, format='pdf')
+    fig.savefig(buf, format='pdf')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
 @app.route('/', methods=['GET', 'POST'])
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Limites de los histogramas: segundos por etapa y bytes de entrada/salida
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Tipo de error segun el prefijo del mensaje que devuelven las funciones (resultado, error)
+ERROR_TYPES = [
+    ('JSON parsing error', 'json_parse'),
+    ('Missing column', 'missing_column'),
+    ('Column length mismatch', 'missing_column'),
+    ('Favor ingresar contenido para las matriculas faltantes', 'missing_aircraft'),
+    ('Date conversion error', 'date_conversion'),
+    ('Unsupported format', 'unsupported_format'),
+]
+
+
+def error_type(message):
+    for prefix, name in ERROR_TYPES:
+        if message.startswith(prefix):
+            return name
+    return 'other'
+
+
+@contextmanager
+def _timed(timings, stage):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+
+@contextmanager
+def _untimed():
+    yield
+
+
+def stage(timings, name):
+    # Con timings=None (instrumentacion apagada) no se mide nada
+    if timings is None:
+        return _untimed()
+    return _timed(timings, name)
+
+
+def format_timings(timings):
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings.items())
+
+
+# Mediciones de pico en curso. tracemalloc y el pico de RSS son de todo el proceso, asi que el pico
+# solo es de una peticion si ninguna otra medicion se solapo con ella
+_peak_lock = threading.Lock()
+_peak_active = []
+
+
+def _reset_peak_rss():
+    # Linux: escribir 5 en clear_refs reinicia VmHWM, el pico de RSS del proceso
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+@contextmanager
+def measure_peak_memory():
+    # result['rss']: pico de RSS del proceso durante la peticion (Linux, sin configuracion).
+    # result['bytes']: con tracemalloc (PYTHONTRACEMALLOC=1), lo que la peticion llego a reservar por
+    # encima de lo que habia al empezar. Quedan en None si no se pueden medir o si otra medicion se
+    # solapo: en ese caso no hay un valor que se pueda atribuir a esta peticion
+    result = {'bytes': None, 'rss': None, 'overlapped': False}
+    tracing = tracemalloc.is_tracing()
+    with _peak_lock:
+        if _peak_active:
+            for other in _peak_active:
+                other['overlapped'] = True
+            result['overlapped'] = True
+        else:
+            if tracing:
+                tracemalloc.reset_peak()
+            result['rss_reset'] = _reset_peak_rss()
+        if tracing:
+            result['baseline'] = tracemalloc.get_traced_memory()[0]
+        _peak_active.append(result)
+    try:
+        yield result
+    finally:
+        with _peak_lock:
+            _peak_active.remove(result)
+            if not result['overlapped']:
+                if tracing and tracemalloc.is_tracing():
+                    result['bytes'] = tracemalloc.get_traced_memory()[1] - result['baseline']
+                if result.get('rss_reset'):
+                    result['rss'] = _peak_rss()
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+def _labels(pairs):
+    return ','.join(f'{key}="{value}"' for key, value in pairs)
+
+
+class Metrics:
+    # Contadores e histogramas en memoria del proceso, expuestos en formato de texto de Prometheus
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._requests = {}
+        self._errors = {}
+        self._stages = {}
+        self._payload = Histogram(SIZE_BUCKETS)
+        self._output = Histogram(SIZE_BUCKETS)
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint, status, payload_bytes=None, output_bytes=None):
+        with self._lock:
+            key = (endpoint or 'unknown', status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if payload_bytes:
+                self._payload.observe(payload_bytes)
+            if output_bytes:
+                self._output.observe(output_bytes)
+
+    def observe_error(self, message):
+        kind = error_type(message)
+        with self._lock:
+            self._errors[kind] = self._errors.get(kind, 0) + 1
+
+    def observe_stages(self, timings):
+        with self._lock:
+            for name, seconds in timings.items():
+                histogram = self._stages.get(name)
+                if histogram is None:
+                    histogram = self._stages[name] = Histogram(STAGE_BUCKETS)
+                histogram.observe(seconds)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append('# HELP schedule_requests_total Requests by endpoint and HTTP status.')
+            lines.append('# TYPE schedule_requests_total counter')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'schedule_requests_total{{{_labels([("endpoint", endpoint), ("status", status)])}}} {count}')
+            lines.append('# HELP schedule_errors_total Rejected requests by error type.')
+            lines.append('# TYPE schedule_errors_total counter')
+            for kind, count in sorted(self._errors.items()):
+                lines.append(f'schedule_errors_total{{type="{kind}"}} {count}')
+            lines.append('# HELP schedule_stage_seconds Time spent in each rendering stage.')
+            lines.append('# TYPE schedule_stage_seconds histogram')
+            for name, histogram in sorted(self._stages.items()):
+                lines.extend(self._histogram_lines('schedule_stage_seconds', histogram, [('stage', name)]))
+            for metric, histogram, text in (('schedule_payload_bytes', self._payload, 'Request body size.'),
+                                            ('schedule_output_bytes', self._output, 'Generated file size.')):
+                lines.append(f'# HELP {metric} {text}')
+                lines.append(f'# TYPE {metric} histogram')
+                lines.extend(self._histogram_lines(metric, histogram, []))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(metric, histogram, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{_labels(labels + [("le", bound)])}}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{_labels(labels + [("le", "+Inf")])}}} {histogram.count}')
+        prefix = f'{{{_labels(labels)}}}' if labels else ''
+        lines.append(f'{metric}_sum{prefix} {histogram.total}')
+        lines.append(f'{metric}_count{prefix} {histogram.count}')
+        return lines
+
+
+def metrics_from_env():
+    return Metrics(enabled=os.environ.get('METRICS_ENABLED', '1') == '1')
+
+
+def timing_header_from_env():
+    return os.environ.get('TIMING_HEADER', '0') == '1'
@@ -0,0 +1,167 @@
+import os
+import threading
+from collections import OrderedDict
+
+# main.py crea la cache al arrancar: NumPy, pandas y el layout se importan dentro de las funciones
+
+# Columnas que definen el contenido de una aeronave en la vista previa; si no cambian se reutiliza su geometria
+KEY_COLUMNS = ['Flight', 'From', 'To', 'Crew', 'Notas', 'Tripadi']
+
+
+def tail_part(reg, df):
+    import numpy as np
+    from conflicts import conflict_report
+    from layout import compute_layout
+    from schedule_model import LABEL_COLUMNS
+
+    # Carriles, etiquetas y conflictos de una sola aeronave. Los carriles solo dependen de los vuelos
+    # de la misma aeronave, asi que son los mismos que calcula ScheduleModel para la tabla completa.
+    start = df['fecha_salida'].min().floor('H')
+    layout = compute_layout(df, [reg], start)
+    positions = layout['positions']
+    labels = {}
+    for name, column in LABEL_COLUMNS.items():
+        values = df[column].to_numpy() if column in df else np.full(len(df), None, dtype=object)
+        labels[name] = values[positions]
+    labels['std'] = df['fecha_salida'].dt.strftime('%H:%M').to_numpy()[positions]
+    labels['sta'] = df['fecha_llegada'].dt.strftime('%H:%M').to_numpy()[positions]
+    return {
+        'salida': df['fecha_salida'].to_numpy()[positions],
+        'llegada': df['fecha_llegada'].to_numpy()[positions],
+        'lane': layout['lane'],
+        'conflict_with': layout['conflict_with'],
+        'lanes': int(layout['lanes_per_tail'][0]),
+        'labels': labels,
+        'conflicts': conflict_report(df, layout, [reg]),
+    }
+
+
+class PreviewCache:
+    # LRU de partes por aeronave: la llave es la matricula y el contenido de sus filas
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            part = self._parts.get(key)
+            if part is None:
+                self.misses += 1
+                return None
+            self._parts.move_to_end(key)
+            self.hits += 1
+            return part
+
+    def put(self, key, part):
+        with self._lock:
+            self._parts[key] = part
+            self._parts.move_to_end(key)
+            while len(self._parts) > self.max_entries:
+                self._parts.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._parts), 'max_entries': self.max_entries}
+
+
+class PreviewModel:
+    # Mismos atributos que usa gantt_svg.render_svg de ScheduleModel, armados con las partes por aeronave.
+    # conflict_with conserva los indices locales de cada aeronave; solo importa si es >= 0.
+
+    def __init__(self, order, parts):
+        import numpy as np
+        import pandas as pd
+        from layout import SLOT_SECONDS
+        from schedule_model import LABEL_COLUMNS
+
+        self.order = list(order)
+        present = [part for part in parts if part is not None]
+        if present:
+            self.start_time = pd.Timestamp(min(part['salida'].min() for part in present)).floor('H')
+            self.end_time = pd.Timestamp(max(part['llegada'].max() for part in present)).ceil('H')
+            self.num_columns = int((self.end_time - self.start_time).total_seconds() / SLOT_SECONDS) + 1
+        else:
+            self.start_time = self.end_time = None
+            self.num_columns = 0
+
+        def joined(arrays, dtype):
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+        self.tail = joined([np.full(len(part['lane']), t, dtype=np.int64) for t, part in enumerate(parts) if part is not None], np.int64)
+        self.lane = joined([part['lane'] for part in present], np.int64)
+        self.salida = joined([part['salida'] for part in present], 'datetime64[ns]')
+        self.llegada = joined([part['llegada'] for part in present], 'datetime64[ns]')
+        self.labels = {}
+        for name in list(LABEL_COLUMNS) + ['std', 'sta']:
+            self.labels[name] = joined([part['labels'][name] for part in present], object)
+        self.layout = {
+            'conflict_with': joined([part['conflict_with'] for part in present], np.int64),
+            'lanes_per_tail': np.array([part['lanes'] if part is not None else 0 for part in parts], dtype=np.int64),
+        }
+        self.conflicts = [item for part in present for item in part['conflicts']]
+
+    def __len__(self):
+        return len(self.tail)
+
+
+def build_preview(df, order, cache):
+    # df ya trae fecha_salida/fecha_llegada; las aeronaves fuera de la flota se ignoran y las que
+    # faltan quedan vacias (la tabla puede estar a medio escribir)
+    import numpy as np
+    import pandas as pd
+
+    df = df.dropna(subset=['fecha_salida', 'fecha_llegada']).reset_index(drop=True)
+    codes = pd.Categorical(df['Reg.'], categories=order).codes
+    positions = np.flatnonzero(codes >= 0)
+    positions = positions[np.argsort(codes[positions], kind='stable')]
+    bounds = np.searchsorted(codes[positions], np.arange(len(order) + 1))
+
+    columns = [df[name].where(df[name].notna(), None).tolist() if name in df else [None] * len(df) for name in KEY_COLUMNS]
+    salida = df['fecha_salida'].to_numpy().astype(np.int64).tolist()
+    llegada = df['fecha_llegada'].to_numpy().astype(np.int64).tolist()
+    rows = list(zip(salida, llegada, *columns))
+
+    parts = []
+    for t, reg in enumerate(order):
+        indices = positions[bounds[t]:bounds[t + 1]]
+        if not len(indices):
+            parts.append(None)
+            continue
+        key = (reg, tuple(rows[i] for i in indices.tolist()))
+        part = cache.get(key)
+        if part is None:
+            part = tail_part(reg, df.iloc[indices])
+            cache.put(key, part)
+        parts.append(part)
+    return PreviewModel(order, parts)
+
+
+def preview_json(model):
+    # Geometria lista para dibujar en el navegador: minutos desde start por vuelo, agrupados por aeronave
+    import numpy as np
+
+    if model.start_time is None:
+        return {'start': None, 'end': None, 'tails': [{'reg': reg, 'lanes': 0, 'flights': []} for reg in model.order],
+                'conflicts': []}
+    start = np.datetime64(model.start_time)
+    begin = ((model.salida - start) / np.timedelta64(1, 'm')).astype(np.int64).tolist()
+    finish = ((model.llegada - start) / np.timedelta64(1, 'm')).astype(np.int64).tolist()
+    lane = model.lane.tolist()
+    conflicted = (model.layout['conflict_with'] >= 0).tolist()
+    labels = {name: [None if value is None or (isinstance(value, float) and np.isnan(value)) else value for value in values.tolist()]
+              for name, values in model.labels.items()}
+    tails = [{'reg': reg, 'lanes': int(lanes), 'flights': []} for reg, lanes in zip(model.order, model.layout['lanes_per_tail'])]
+    for i, t in enumerate(model.tail.tolist()):
+        flight = {'start': begin[i], 'end': finish[i], 'lane': lane[i], 'conflict': conflicted[i]}
+        flight.update((name, values[i]) for name, values in labels.items())
+        tails[t]['flights'].append(flight)
+    return {'start': model.start_time.isoformat(), 'end': model.end_time.isoformat(), 'tails': tails,
+            'conflicts': model.conflicts}
+
+
+def preview_cache_from_env():
+    return PreviewCache(max_entries=int(os.environ.get('PREVIEW_CACHE_MAX_ENTRIES', 256)))
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(table_data, additional_text):
+    # Normaliza el JSON (orden de llaves y espacios) para que la misma tabla produzca la misma llave
+    try:
+        normalized = json.dumps(json.loads(table_data), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    except (TypeError, ValueError):
+        normalized = table_data or ''
+    digest = hashlib.sha256()
+    digest.update(normalized.encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update((additional_text or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    # Cache LRU en memoria de archivos ya generados, limitada por bytes, entradas y TTL opcional
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=128, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            data, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (data, time.monotonic())
+            self._size += len(data)
+            while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        data, _ = self._entries.pop(key)
+        self._size -= len(data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def cache_from_env():
+    ttl = os.environ.get('RENDER_CACHE_TTL')
+    return RenderCache(max_bytes=int(os.environ.get('RENDER_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+                       max_entries=int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', 128)),
+                       ttl=float(ttl) if ttl else None)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from conflicts import conflict_report
+from layout import SLOT_SECONDS, FIRST_TIME_COL, compute_layout, tail_range
+
+# Columnas de texto que usan los renderizadores, con su nombre dentro del modelo
+LABEL_COLUMNS = {
+    'flight': 'Flight',
+    'origin': 'From',
+    'destination': 'To',
+    'crew': 'Crew',
+    'notas': 'Notas',
+    'tripadi': 'Tripadi',
+}
+
+
+class ScheduleModel:
+    # Representacion intermedia de un horario, calculada una vez por solicitud y compartida por
+    # los renderizadores xlsx, PDF/PNG y SVG/HTML. Todos los arreglos van en el orden del layout
+    # (agrupados por aeronave segun order).
+
+    def __init__(self, df, order, start_time=None):
+        self.order = list(order)
+        self.start_time = start_time if start_time is not None else df['fecha_salida'].min().floor('H')
+        self.end_time = df['fecha_llegada'].max().ceil('H')
+        if len(df):
+            self.num_columns = int((self.end_time - self.start_time).total_seconds() / SLOT_SECONDS) + 1
+        else:
+            self.num_columns = 0
+        self.layout = compute_layout(df, self.order, self.start_time)
+
+        positions = self.layout['positions']
+        self.tail = self.layout['tail']
+        self.lane = self.layout['lane']
+        self.start_slot = self.layout['start_col'] - FIRST_TIME_COL
+        self.end_slot = self.layout['end_col'] - FIRST_TIME_COL
+        self.salida = df['fecha_salida'].to_numpy()[positions]
+        self.llegada = df['fecha_llegada'].to_numpy()[positions]
+        self.labels = {}
+        for name, column in LABEL_COLUMNS.items():
+            values = df[column].to_numpy() if column in df else np.full(len(df), None, dtype=object)
+            self.labels[name] = values[positions]
+        self.labels['std'] = df['fecha_salida'].dt.strftime('%H:%M').to_numpy()[positions]
+        self.labels['sta'] = df['fecha_llegada'].dt.strftime('%H:%M').to_numpy()[positions]
+        self.conflicts = conflict_report(df, self.layout, self.order)
+
+    def __len__(self):
+        return len(self.tail)
+
+    def replace_tails(self, df, tails):
+        # Copia del modelo con las aeronaves tails (indices en order) recalculadas desde df, que trae
+        # solo las filas de esas aeronaves; las demas se copian tal cual, porque carriles y conflictos
+        # solo dependen de los vuelos de la misma aeronave. start_time y las columnas no cambian.
+        # El layout resultante no trae 'positions': sus filas vienen de tablas distintas
+        import copy
+
+        part = ScheduleModel(df, self.order, self.start_time)
+        tails = set(tails)
+        sources = [part if t in tails else self for t in range(len(self.order))]
+        pieces = [(source, source.tail_range(t)) for t, source in enumerate(sources)]
+
+        def joined(values):
+            return np.concatenate([values(source)[r.start:r.stop] for source, r in pieces])
+
+        layout = {key: joined(lambda source: source.layout[key]) for key in ('tail', 'start_col', 'end_col', 'mid_col', 'lane')}
+        # conflict_with apunta a indices del arreglo de origen: se corren a la nueva posicion
+        conflict_with = []
+        offset = 0
+        for source, r in pieces:
+            values = source.layout['conflict_with'][r.start:r.stop]
+            conflict_with.append(np.where(values >= 0, values - r.start + offset, -1))
+            offset += len(r)
+        layout['conflict_with'] = np.concatenate(conflict_with)
+        layout['lanes_per_tail'] = np.array([source.layout['lanes_per_tail'][t] for t, source in enumerate(sources)], dtype=np.int64)
+        layout['bounds'] = np.searchsorted(layout['tail'], np.arange(len(self.order) + 1))
+
+        model = copy.copy(self)
+        model.layout = layout
+        model.tail = layout['tail']
+        model.lane = layout['lane']
+        model.start_slot = layout['start_col'] - FIRST_TIME_COL
+        model.end_slot = layout['end_col'] - FIRST_TIME_COL
+        model.salida = joined(lambda source: source.salida)
+        model.llegada = joined(lambda source: source.llegada)
+        model.labels = {name: joined(lambda source: source.labels[name]) for name in self.labels}
+        model.conflicts = [item for t, source in enumerate(sources) for item in source.conflicts if item['reg'] == self.order[t]]
+        return model
+
+    def tail_range(self, tail_index):
+        return tail_range(self.layout, tail_index)
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class ScheduleSession:
+    # Estado de un despachador: el libro ya generado y su geometria, para aplicar solo los cambios.
+    # Una sesion creada junto con un trabajo guarda en pending (job_id, tabla, columnar, row_ids)
+    # hasta tomar el horario que armo ese trabajo
+
+    def __init__(self, df, additional_text, schedule=None, pending=None):
+        self.df = df
+        self.additional_text = additional_text
+        self.schedule = schedule
+        self.pending = pending
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    # Sesiones en memoria con limite de entradas (LRU) y expiracion por inactividad
+
+    def __init__(self, max_entries=32, ttl=1800):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, df, additional_text, schedule=None, pending=None):
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = (ScheduleSession(df, additional_text, schedule, pending), time.monotonic())
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [session_id for session_id, (_, used) in self._sessions.items() if now - used > self.ttl]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+
+def sessions_from_env():
+    return SessionStore(max_entries=int(os.environ.get('SESSION_MAX_ENTRIES', 32)),
+                        ttl=float(os.environ.get('SESSION_TTL', 1800)))
@@ -0,0 +1,61 @@
+# Juntar en un libro hojas armadas en otros libros (por ejemplo, en otros procesos) sin copiar celdas
+
+
+def rebind_dimensions(workbook):
+    # Un libro que vuelve de pickle trae row_dimensions/column_dimensions sin default_factory:
+    # defaultdict la pasa como primer argumento del constructor, que en DimensionHolder es la hoja.
+    # Se vuelve a enlazar para que las filas y columnas nuevas se creen como en un libro recien armado
+    for sheet in workbook.worksheets:
+        sheet.row_dimensions.default_factory = sheet._add_row
+        sheet.column_dimensions.default_factory = sheet._add_column
+    return workbook
+
+
+def style_map(target, source):
+    # Traduce un StyleArray de source a los indices de target. Las listas de estilos son cortas, así
+    # que se traducen completas una vez; cada combinacion distinta se arma una sola vez
+    from openpyxl.styles.cell_style import StyleArray
+    from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE
+
+    fonts = [target._fonts.add(item) for item in source._fonts]
+    fills = [target._fills.add(item) for item in source._fills]
+    borders = [target._borders.add(item) for item in source._borders]
+    alignments = [target._alignments.add(item) for item in source._alignments]
+    protections = [target._protections.add(item) for item in source._protections]
+    formats = [BUILTIN_FORMATS_MAX_SIZE + target._number_formats.add(item) for item in source._number_formats]
+    names = target._named_styles.names
+    named = [names.index(style.name) if style.name in names else 0 for style in source._named_styles]
+    translated = {}
+
+    def translate(style):
+        # None es el estilo por defecto, igual en los dos libros
+        if style is None:
+            return None
+        key = tuple(style)
+        result = translated.get(key)
+        if result is None:
+            num_fmt = style.numFmtId
+            if num_fmt >= BUILTIN_FORMATS_MAX_SIZE:
+                num_fmt = formats[num_fmt - BUILTIN_FORMATS_MAX_SIZE]
+            result = translated[key] = StyleArray([fonts[style.fontId], fills[style.fillId], borders[style.borderId],
+                                                   num_fmt, protections[style.protectionId],
+                                                   alignments[style.alignmentId], style.pivotButton,
+                                                   style.quotePrefix, named[style.xfId]])
+        return StyleArray(result)
+
+    return translate
+
+
+def adopt_sheet(target, sheet, title):
+    # Mueve sheet (de otro libro) al final de target: las celdas (tambien las cubiertas por una
+    # combinacion) y los estilos de fila y columna cambian de libro traduciendo solo sus indices de
+    # estilo. El formato condicional guarda sus estilos en la regla y se registra en target al guardar.
+    translate = style_map(target, sheet.parent)
+    for cell in sheet._cells.values():
+        cell._style = translate(cell._style)
+    for dimension in list(sheet.row_dimensions.values()) + list(sheet.column_dimensions.values()):
+        dimension._style = translate(dimension._style)
+    sheet._parent = target
+    target._sheets.append(sheet)
+    sheet.title = title
+    return sheet
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Version del formato de los marcos en disco; se sube si cambia lo que se guarda con pickle
+FRAME_FORMAT = 1
+# Modulos que arman el marco (build_frame, estilos y writers). Su codigo entra en el nombre del
+# archivo: despues de un despliegue que cambie el marco no se sirven pickles viejos
+FRAME_SOURCES = ('mainMAX.py', 'styles.py', 'writers.py', 'sheets.py')
+
+
+def skeleton_key(fleet, num_columns, backend):
+    # El marco solo depende del orden y la altura de las franjas, de cuantas columnas de horas hay y
+    # del backend que lo escribe
+    return (tuple(fleet.order), tuple(fleet.heights.tolist()), fleet.first_row, int(num_columns), backend)
+
+
+class SkeletonCache:
+    # Writers con el marco fijo del libro (titulos, franjas de la columna A, bordes y anchos) ya armados y
+    # guardados con pickle; cada solicitud recibe una copia nueva con pickle.loads, que es varias
+    # veces mas rapido que volver a crear las celdas y estilos. Con directory el marco tambien se
+    # guarda en disco y sobrevive a reinicios del proceso. Como los archivos se leen con pickle.loads,
+    # directory tiene que ser privado del usuario del proceso (0700): si otro usuario puede escribir
+    # en el, el disco no se usa.
+
+    def __init__(self, max_entries=16, directory=None, sources=FRAME_SOURCES):
+        self.max_entries = max_entries
+        self.rejected_directory = None
+        if directory and not self._private(directory):
+            self.rejected_directory, directory = directory, None
+        self.directory = directory
+        self._version = self._source_digest(sources) if directory else None
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _private(directory):
+        # Se crea con permisos 0700; uno que ya existe tiene que ser del usuario y sin acceso de grupo u otros
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            info = os.stat(directory)
+        except OSError:
+            return False
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            return False
+        return not info.st_mode & 0o077
+
+    @staticmethod
+    def _source_digest(sources):
+        digest = hashlib.sha256()
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in sources:
+            try:
+                with open(os.path.join(base, name), 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(name.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        import openpyxl
+
+        # La version de openpyxl, la del formato y el codigo que arma el marco entran en el nombre:
+        # un pickle de otra version o de otro despliegue no se reutiliza
+        digest = hashlib.sha256(repr((openpyxl.__version__, FRAME_FORMAT, self._version, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'skeleton-{digest}.pkl')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, key, data):
+        # Escritura atomica para que otro proceso nunca lea un archivo a medias
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            pass
+
+    def clone(self, key, build):
+        # build() arma el marco cuando no esta en memoria ni en disco
+        with self._lock:
+            data = self._frames.get(key)
+            if data is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+        if data is None and self.directory:
+            data = self._load(key)
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+        if data is None:
+            data = pickle.dumps(build(), protocol=pickle.HIGHEST_PROTOCOL)
+            with self._lock:
+                self.misses += 1
+            if self.directory:
+                self._store(key, data)
+        with self._lock:
+            self._frames[key] = data
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+        # Cada copia restaura lo que pickle no conserva: OpenpyxlWriter.__setstate__ vuelve a enlazar
+        # row_dimensions/column_dimensions con rebind_dimensions, igual que un libro recien armado
+        return pickle.loads(data)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._frames), 'max_entries': self.max_entries, 'directory': self.directory,
+                    'rejected_directory': self.rejected_directory}
+
+
+def skeleton_cache_from_env():
+    return SkeletonCache(max_entries=int(os.environ.get('SKELETON_CACHE_MAX_ENTRIES', 16)),
+                         directory=os.environ.get('SKELETON_CACHE_DIR') or None)
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+APPS = ['main', 'mainMAX', 'mainFINAL', 'mainL']
+
+# Se ejecuta en un proceso nuevo: importa la aplicacion y mide la primera y la segunda solicitud
+PROBE = '''
+import json, time
+t0 = time.perf_counter()
+import {app} as app_module
+imported = time.perf_counter() - t0
+from fleet import FLEET
+from startup import tiny_schedule
+client = app_module.app.test_client()
+data = json.dumps(tiny_schedule(FLEET.order))
+requests = []
+for _ in range(2):
+    t0 = time.perf_counter()
+    response = client.post('/', data={{'table_data': data, 'additional_text': 'startup'}})
+    requests.append(time.perf_counter() - t0)
+print(json.dumps({{'import': imported, 'first_request': requests[0], 'second_request': requests[1],
+                  'status': response.status_code}}))
+'''
+
+
+def warmup_from_env():
+    return os.environ.get('WARMUP', '0') == '1'
+
+
+def tiny_schedule(order):
+    # Un vuelo por aeronave: suficiente para cargar todas las dependencias y cachés de fuentes
+    rows = []
+    for i, reg in enumerate(order):
+        rows.append({'Flight': f'QT{100 + i}', 'STD': '01Jan 06:00', 'STA': '01Jan 07:30', 'From': 'BOG',
+                     'To': 'MDE', 'Reg.': reg, 'Crew': 'AAA/BBB', 'Notas': '', 'Tripadi': ''})
+    return rows
+
+
+def measure(app, warmup):
+    # Tiempo de arranque en frio de una aplicacion: proceso completo, importacion y primeras solicitudes
+    env = dict(os.environ, WARMUP='1' if warmup else '0')
+    t0 = time.perf_counter()
+    process = subprocess.run([sys.executable, '-c', PROBE.format(app=app)], capture_output=True, text=True, env=env,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    total = time.perf_counter() - t0
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {'app': app, 'warmup': warmup, 'error': lines[-1] if lines else f'exit code {process.returncode}'}
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result.update(app=app, warmup=warmup, process=total)
+    return result
+
+
+if __name__ == '__main__':
+    # python startup.py [app ...]: compara el arranque con y sin WARMUP y escribe JSON en la salida estandar
+    results = [measure(app, warmup) for app in sys.argv[1:] or APPS for warmup in (False, True)]
+    for r in results:
+        if 'error' in r:
+            print(f"{r['app']:>9} warmup={r['warmup']!s:<5} {r['error']}", file=sys.stderr)
+        else:
+            print(f"{r['app']:>9} warmup={r['warmup']!s:<5} import {r['import']:.3f}s  first request "
+                  f"{r['first_request']:.3f}s  second {r['second_request']:.3f}s  process {r['process']:.3f}s",
+                  file=sys.stderr)
+    print(json.dumps(results, indent=2))
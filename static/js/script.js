@@ -17,16 +17,220 @@ document.addEventListener('DOMContentLoaded', function() {
         ]
     });
 
-    document.getElementById('dataForm').addEventListener('submit', function() {
-        var table_data = hot.getData();
+    function rowObject(row, headers) {
+        var rowData = {};
+        headers.forEach((header, index) => {
+            rowData[header] = row[index];
+        });
+        return rowData;
+    }
+
+    // Formato columnar compacto: una lista por columna usada, sin filas vacías.
+    // Si se pasa ids, recibe el identificador de cada fila enviada
+    var RENDER_COLUMNS = ['Flight', 'STD', 'STA', 'From', 'To', 'Reg.', 'Crew', 'Notas', 'Tripadi'];
+
+    function tableColumns(ids) {
         var headers = hot.getColHeader();
-        var json_data = table_data.map(row => {
-            var rowData = {};
-            headers.forEach((header, index) => {
-                rowData[header] = row[index];
-            });
-            return rowData;
+        var indices = RENDER_COLUMNS.map(name => headers.indexOf(name));
+        var columns = {};
+        RENDER_COLUMNS.forEach(name => { columns[name] = []; });
+        hot.getData().forEach((row, rowIndex) => {
+            var values = indices.map(index => row[index]);
+            if (values.every(value => value === null || value === undefined || value === '')) {
+                return;
+            }
+            RENDER_COLUMNS.forEach((name, i) => { columns[name].push(values[i] === undefined ? null : values[i]); });
+            if (ids) {
+                ids.push(rowIds[rowIndex]);
+            }
+        });
+        return JSON.stringify({ columns: columns });
+    }
+
+    // Identificadores estables por fila para enviar al servidor solo las filas cambiadas
+    var rowIds = [];
+    var nextRowId = 0;
+    var sessionId = null;
+    var dirtyRows = new Set();
+    var removedRows = [];
+
+    function newRowIds(amount) {
+        var ids = [];
+        for (var i = 0; i < amount; i++) {
+            ids.push('r' + (nextRowId++));
+        }
+        return ids;
+    }
+
+    function syncRowIds() {
+        var missing = hot.countRows() - rowIds.length;
+        if (missing > 0) {
+            rowIds.push.apply(rowIds, newRowIds(missing));
+        }
+    }
+
+    hot.addHook('afterCreateRow', function(index, amount) {
+        var ids = newRowIds(amount);
+        rowIds.splice.apply(rowIds, [index, 0].concat(ids));
+        ids.forEach(id => dirtyRows.add(id));
+    });
+
+    hot.addHook('afterRemoveRow', function(index, amount) {
+        rowIds.splice(index, amount).forEach(id => {
+            dirtyRows.delete(id);
+            removedRows.push(id);
+        });
+    });
+
+    hot.addHook('afterChange', function(changes, source) {
+        if (!changes || source === 'loadData') {
+            return;
+        }
+        syncRowIds();
+        changes.forEach(change => dirtyRows.add(rowIds[change[0]]));
+    });
+
+    // Vista previa del Gantt bajo la grilla: se pide al servidor cuando la edición se detiene
+    var PREVIEW_DELAY_MS = 400;
+    var previewEl = document.getElementById('preview');
+    var previewTimer = null;
+    var previewRequest = null;
+
+    function refreshPreview() {
+        if (previewRequest) {
+            previewRequest.abort();
+        }
+        previewRequest = new AbortController();
+        var data = new FormData();
+        data.append('table_columns', tableColumns());
+        data.append('additional_text', document.getElementById('additional_text').value);
+        data.append('format', 'svg');
+        fetch('/preview', { method: 'POST', body: data, signal: previewRequest.signal })
+            .then(response => response.ok ? response.text() : null)
+            .then(svg => {
+                if (svg !== null) {
+                    previewEl.innerHTML = svg;
+                }
+            })
+            .catch(() => {});
+    }
+
+    function schedulePreview() {
+        clearTimeout(previewTimer);
+        previewTimer = setTimeout(refreshPreview, PREVIEW_DELAY_MS);
+    }
+
+    hot.addHook('afterChange', function(changes) {
+        if (changes) {
+            schedulePreview();
+        }
+    });
+    hot.addHook('afterRemoveRow', schedulePreview);
+    document.getElementById('additional_text').addEventListener('input', schedulePreview);
+
+    function downloadBlob(blob) {
+        var url = URL.createObjectURL(blob);
+        var link = document.createElement('a');
+        link.href = url;
+        link.download = 'programacion_vuelos_qt.xlsx';
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        URL.revokeObjectURL(url);
+    }
+
+    function resetChanges() {
+        dirtyRows.clear();
+        removedRows = [];
+    }
+
+    function sendDelta(form) {
+        var headers = hot.getColHeader();
+        var upsert = {};
+        dirtyRows.forEach(id => {
+            var index = rowIds.indexOf(id);
+            if (index >= 0) {
+                upsert[id] = rowObject(hot.getDataAtRow(index), headers);
+            }
+        });
+        var delta = { upsert: upsert, delete: removedRows, additional_text: form.additional_text.value };
+        resetChanges();
+        return fetch('/sessions/' + sessionId + '/delta', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(delta)
         });
-        document.getElementById('table_data').value = JSON.stringify(json_data);
+    }
+
+    var statusEl = document.getElementById('status');
+
+    // Envia la tabla como trabajo en segundo plano y consulta su estado hasta que el archivo esté listo
+    function pollJob(job) {
+        fetch(job.status_url)
+            .then(response => response.json())
+            .then(result => {
+                if (result.status === 'done') {
+                    statusEl.textContent = '';
+                    window.location = job.download_url;
+                } else if (result.status === 'failed' || result.error) {
+                    statusEl.textContent = 'Error: ' + result.error;
+                } else {
+                    statusEl.textContent = 'Generando archivo... (' + result.status + ')';
+                    setTimeout(function() { pollJob(job); }, 500);
+                }
+            })
+            .catch(error => { statusEl.textContent = 'Error: ' + error; });
+    }
+
+    // La misma tabla abre la sesión en el servidor (row_ids): los siguientes envíos llevan solo los cambios
+    function submitJob(form) {
+        syncRowIds();
+        var ids = [];
+        form.table_columns.value = tableColumns(ids);
+        var data = new FormData(form);
+        data.append('row_ids', JSON.stringify(ids));
+        resetChanges();
+        statusEl.textContent = 'Enviando tabla...';
+        fetch('/jobs', { method: 'POST', body: data })
+            .then(response => response.json())
+            .then(job => {
+                sessionId = job.session_id || null;
+                if (job.error) {
+                    statusEl.textContent = 'Error: ' + job.error;
+                } else {
+                    pollJob(job);
+                }
+            })
+            .catch(error => {
+                sessionId = null;
+                statusEl.textContent = 'Error: ' + error;
+            });
+    }
+
+    document.getElementById('dataForm').addEventListener('submit', function(event) {
+        var form = this;
+        event.preventDefault();
+        if (!sessionId || (dirtyRows.size === 0 && removedRows.length === 0)) {
+            submitJob(form);
+            return;
+        }
+        statusEl.textContent = 'Aplicando cambios...';
+        sendDelta(form)
+            .then(response => {
+                if (response.status === 404) {
+                    // La sesión expiró en el servidor: se envía la tabla completa
+                    sessionId = null;
+                    submitJob(form);
+                } else if (response.ok) {
+                    statusEl.textContent = '';
+                    return response.blob().then(downloadBlob);
+                } else {
+                    return response.json().then(result => {
+                        sessionId = null;
+                        statusEl.textContent = 'Error: ' + result.error;
+                    });
+                }
+            })
+            .catch(error => { statusEl.textContent = 'Error: ' + error; });
     });
 });
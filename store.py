@@ -0,0 +1,138 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedules.db')
+TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+# Columnas de la tabla de vuelos y su columna equivalente en el DataFrame
+FLIGHT_COLUMNS = [
+    ('flight', 'Flight'),
+    ('std_text', 'STD'),
+    ('sta_text', 'STA'),
+    ('origin', 'From'),
+    ('destination', 'To'),
+    ('reg', 'Reg.'),
+    ('crew', 'Crew'),
+    ('notas', 'Notas'),
+    ('tripadi', 'Tripadi'),
+]
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS flights (
+    id INTEGER PRIMARY KEY,
+    departure TEXT NOT NULL,
+    arrival TEXT NOT NULL,
+    flight TEXT,
+    std_text TEXT,
+    sta_text TEXT,
+    origin TEXT,
+    destination TEXT,
+    reg TEXT NOT NULL,
+    crew TEXT,
+    notas TEXT,
+    tripadi TEXT
+);
+CREATE INDEX IF NOT EXISTS flights_departure ON flights (departure);
+CREATE INDEX IF NOT EXISTS flights_reg_departure ON flights (reg, departure);
+'''
+
+
+class ScheduleStore:
+    # Vuelos guardados en SQLite con indices por hora de salida y por aeronave + hora de salida.
+    # Las conexiones se reutilizan desde un pool de tamaño fijo.
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=4, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # Como mucho pool_size conexiones en uso; una transaccion por bloque
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._pool.put(conn)
+        finally:
+            self._slots.release()
+
+    def save(self, df):
+        # df ya trae fecha_salida/fecha_llegada. Los vuelos guardados de las mismas aeronaves que salen
+        # dentro del rango del horario nuevo se reemplazan (gana la ultima version).
+        if df.empty:
+            return 0
+        departure = df['fecha_salida'].dt.strftime(TIME_FORMAT)
+        arrival = df['fecha_llegada'].dt.strftime(TIME_FORMAT)
+        columns = [departure, arrival]
+        for _, name in FLIGHT_COLUMNS:
+            if name in df:
+                values = df[name].astype(object)
+                columns.append(values.where(values.notna(), None).map(lambda v: v if v is None else str(v)))
+            else:
+                columns.append([None] * len(df))
+        rows = list(zip(*columns))
+        regs = sorted(df['Reg.'].astype(str).unique())
+        first, last = departure.min(), departure.max()
+        placeholders = ','.join('?' * len(regs))
+        names = ', '.join(['departure', 'arrival'] + [column for column, _ in FLIGHT_COLUMNS])
+        with self.connection() as conn:
+            conn.execute(f'DELETE FROM flights WHERE departure BETWEEN ? AND ? AND reg IN ({placeholders})',
+                         [first, last] + regs)
+            conn.executemany(f'INSERT INTO flights ({names}) VALUES ({",".join("?" * (len(FLIGHT_COLUMNS) + 2))})', rows)
+        return len(rows)
+
+    def query(self, start, end, tails=None):
+        # Vuelos que salen en [start, end), opcionalmente solo de algunas aeronaves.
+        # Devuelve un DataFrame con las columnas de la grilla y las fechas ya convertidas.
+        import pandas as pd
+
+        sql = 'SELECT departure, arrival, ' + ', '.join(column for column, _ in FLIGHT_COLUMNS) + \
+              ' FROM flights WHERE departure >= ? AND departure < ?'
+        params = [start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)]
+        if tails:
+            sql += f' AND reg IN ({",".join("?" * len(tails))})'
+            params += list(tails)
+        sql += ' ORDER BY reg, departure'
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows, columns=['fecha_salida', 'fecha_llegada'] + [name for _, name in FLIGHT_COLUMNS])
+        df['fecha_salida'] = pd.to_datetime(df['fecha_salida'], format=TIME_FORMAT)
+        df['fecha_llegada'] = pd.to_datetime(df['fecha_llegada'], format=TIME_FORMAT)
+        return df
+
+
+def store_from_env():
+    return ScheduleStore(path=os.environ.get('SCHEDULE_DB', DEFAULT_DB_PATH),
+                         pool_size=int(os.environ.get('SCHEDULE_DB_POOL', 4)))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # La base se abre (y se crea) con la primera solicitud que la usa
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = store_from_env()
+        return _store
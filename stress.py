@@ -0,0 +1,161 @@
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Fecha fija en los PDF (matplotlib la toma de SOURCE_DATE_EPOCH) para que la salida se pueda comparar byte a byte
+os.environ.setdefault('SOURCE_DATE_EPOCH', '0')
+
+APPS = ['main', 'mainMAX', 'mainFINAL', 'mainL', 'mainOK']
+# Apps que reciben el horario como archivo CSV (multipart) en lugar de la tabla en JSON
+UPLOAD_APPS = {'mainOK'}
+CSV_COLUMNS = 'fecha_salida;fecha_llegada;aeronave;numero_vuelo;origen;destino'
+XLSX_TIMESTAMPS = 'docProps/core.xml'
+
+
+def canonical(data):
+    # Los xlsx llevan la hora de creacion en docProps/core.xml y en la cabecera de cada miembro del ZIP;
+    # se compara el contenido de cada miembro sin esas marcas. Los PDF/PNG se comparan tal cual.
+    if not data.startswith(b'PK'):
+        return data
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return tuple((name, archive.read(name)) for name in sorted(archive.namelist()) if name != XLSX_TIMESTAMPS)
+
+
+def start_server(app):
+    # Servidor WSGI con un hilo por solicitud, como gunicorn/waitress con hilos
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content) in files.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   'Content-Type: text/csv\r\n\r\n'.encode('utf-8'))
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode('utf-8'))
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def post(url, fields, files=None):
+    # Devuelve el cuerpo de la respuesta, o None si el servidor respondio con error
+    if files:
+        body, content_type = multipart(fields, files)
+    else:
+        body, content_type = urllib.parse.urlencode(fields).encode('utf-8'), 'application/x-www-form-urlencoded'
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            return response.read()
+    except urllib.error.HTTPError:
+        return None
+
+
+def payloads(count, legs, days):
+    from benchmark import synthetic_schedule
+    from fleet import FLEET
+
+    return [{'table_data': json.dumps(synthetic_schedule(legs, len(FLEET.order), days, seed)),
+             'additional_text': f'stress {seed}'} for seed in range(count)]
+
+
+def as_upload(fields):
+    # El mismo horario como el CSV separado por ';' que espera mainOK
+    lines = [CSV_COLUMNS]
+    for row in json.loads(fields['table_data']):
+        salida = datetime.datetime.strptime(row['STD'], '%d%b %H:%M')
+        llegada = datetime.datetime.strptime(row['STA'], '%d%b %H:%M')
+        lines.append(f"{salida:%Y-%m-%d %H:%M};{llegada:%Y-%m-%d %H:%M};{row['Reg.']};{row['Flight']};{row['From']};{row['To']}")
+    return {'additional_text': fields['additional_text']}, {'file': ('programacion.csv', '\n'.join(lines).encode('utf-8'))}
+
+
+def stress(app_name, tables, repeat, threads, cache=False):
+    from render_cache import RenderCache
+
+    module = __import__(app_name)
+    # La salida en serie se genera sin cache de archivos. En el pase con cache, la fase en paralelo
+    # arranca con una cache vacia: mezcla fallos, escrituras y aciertos, y cada respuesta se compara igual
+    if hasattr(module, 'render_cache'):
+        module.render_cache = RenderCache(max_entries=0)
+    if app_name in UPLOAD_APPS:
+        requests = [as_upload(fields) for fields in tables]
+    else:
+        requests = [(fields, None) for fields in tables]
+    server = start_server(module.app)
+    url = f'http://127.0.0.1:{server.server_port}/'
+    try:
+        t0 = time.perf_counter()
+        expected = []
+        for fields, files in requests:
+            data = post(url, fields, files)
+            if data is None:
+                raise RuntimeError(f'{app_name}: serial request failed')
+            expected.append(canonical(data))
+        serial = time.perf_counter() - t0
+
+        if cache and hasattr(module, 'render_cache'):
+            module.render_cache = RenderCache()
+        work = [i for i in range(len(tables)) for _ in range(repeat)]
+        random.Random(0).shuffle(work)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            outputs = list(pool.map(lambda i: (i, post(url, *requests[i])), work))
+        parallel = time.perf_counter() - t0
+    finally:
+        server.shutdown()
+    errors = sum(1 for _, data in outputs if data is None)
+    mismatches = sum(1 for i, data in outputs if data is not None and canonical(data) != expected[i])
+    return {'app': app_name, 'cache': cache, 'requests': len(work), 'threads': threads, 'errors': errors, 'mismatches': mismatches,
+            'serial_per_request': serial / len(tables), 'parallel_per_request': parallel / len(work)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solicitudes concurrentes a index comparadas con la salida en serie')
+    parser.add_argument('apps', nargs='*', default=APPS)
+    parser.add_argument('--tables', type=int, default=8, help='horarios distintos')
+    parser.add_argument('--repeat', type=int, default=8, help='veces que se envia cada horario en paralelo')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--legs', type=int, default=60)
+    parser.add_argument('--days', type=int, default=1)
+    args = parser.parse_args()
+
+    tables = payloads(args.tables, args.legs, args.days)
+    results = []
+    for app_name in args.apps:
+        # Las apps con cache de archivos se prueban tambien con la cache encendida
+        passes = [False, True] if hasattr(__import__(app_name), 'render_cache') else [False]
+        for cache in passes:
+            result = stress(app_name, tables, args.repeat, args.threads, cache)
+            results.append(result)
+            label = f'{app_name}+cache' if cache else app_name
+            print(f"{label:>11} {result['requests']} requests on {args.threads} threads: {result['errors']} errors, {result['mismatches']} mismatches  "
+                  f"serial {result['serial_per_request'] * 1000:.0f} ms/request  "
+                  f"parallel {result['parallel_per_request'] * 1000:.0f} ms/request", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+    if any(r['errors'] or r['mismatches'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
+
+# Estilos compartidos por todas las celdas de la hoja. Se crean una sola vez al
+# importar el modulo y cada celda referencia el mismo objeto.
+
+MEDIUM = Side(style='medium')
+THIN = Side(style='thin')
+
+# Relleno de las franjas de vuelo
+FILL_BLUE = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+FILL_YELLOW = PatternFill(start_color="FFFFE0", end_color="FFFFE0", fill_type="solid")
+FILL_LIGHT_GRAY = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+FILL_WHITE = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+
+# Bordes de la franja: (fila superior, fila central, fila inferior)
+SLOT_START_BORDERS = (Border(left=MEDIUM, top=MEDIUM), Border(left=MEDIUM), Border(left=MEDIUM, bottom=MEDIUM))
+SLOT_END_BORDERS = (Border(right=MEDIUM, top=MEDIUM), Border(right=MEDIUM), Border(right=MEDIUM, bottom=MEDIUM))
+SLOT_INTERIOR_BORDERS = (Border(top=MEDIUM), None, Border(bottom=MEDIUM))
+
+# Etiquetas
+CENTER = Alignment(horizontal='center', vertical='center')
+RIGHT = Alignment(horizontal='right')
+FLIGHT_LABEL_FONT = Font(bold=True)
+TIME_LABEL_FONT = Font(bold=True, color="8B0000")  # Vinotinto
+TITLE_FONT = Font(size=22, bold=True)
+SUBTITLE_FONT = Font(size=22, italic=True)
+TAIL_LABEL_FONT = Font(size=28, bold=True)
+TAIL_LABEL_ALIGNMENT = Alignment(horizontal='center', vertical='center', text_rotation=90)
+
+# Separadores de franja y marcas verticales
+BAND_EDGE_BORDER = Border(left=MEDIUM, right=MEDIUM, top=MEDIUM, bottom=MEDIUM)
+BAND_INNER_BORDER = Border(left=THIN)
+BAND_SEPARATOR_BORDER = Border(top=MEDIUM)
+TIME_AXIS_BORDER = Border(left=Side(style='thick', color='000000'))
+MARKER_0500_BORDER = Border(left=Side(style='dashed', color='FF0000'))
@@ -0,0 +1,143 @@
+import argparse
+import io
+import json
+import sys
+
+# Compara los dos backends de writers.py sobre horarios sinteticos de mainMAX: cada hoja se lee con
+# openpyxl y se compara lo que se ve en cada celda, no los bytes (el orden de los estilos y la forma
+# de guardar el texto pueden cambiar entre backends)
+HORIZONS = ['single', 'daily']
+SIDES = ('left', 'right', 'top', 'bottom')
+
+
+def side(border, name):
+    item = getattr(border, name) if border is not None else None
+    if item is None or not item.style:
+        return None
+    return item.style, color(item.color)
+
+
+def color(item):
+    # Los colores de tema no traen rgb
+    rgb = getattr(item, 'rgb', None)
+    return rgb if isinstance(rgb, str) else None
+
+
+def appearance(style):
+    # Relleno y bordes de una celda o de un estilo de fila/columna
+    fill = color(style.fill.fgColor) if style.fill is not None and style.fill.fill_type else None
+    return fill, [side(style.border, name) for name in SIDES]
+
+
+def sheet_view(sheet):
+    # Aspecto efectivo de cada celda: celda propia > estilo de fila > estilo de columna, con el
+    # formato condicional encima. Las celdas cubiertas por una combinacion no se ven
+    from openpyxl.utils import column_index_from_string
+
+    columns = {}
+    for key, dimension in sheet.column_dimensions.items():
+        first = dimension.min or column_index_from_string(key)
+        for col in range(first, (dimension.max or first) + 1):
+            columns[col] = dimension
+    covered = set()
+    for merged in sheet.merged_cells.ranges:
+        covered.update(list(merged.cells)[1:])
+    rules = [(cell_range, rule.dxf) for formatting in sheet.conditional_formatting
+             for rule in formatting.rules for cell_range in formatting.sqref.ranges]
+
+    max_row = max([sheet.max_row] + list(sheet.row_dimensions.keys()))
+    max_col = max([sheet.max_column] + list(columns))
+    cells = {}
+    for row in range(1, max_row + 1):
+        row_style = sheet.row_dimensions[row] if row in sheet.row_dimensions else None
+        for col in range(1, max_col + 1):
+            if (row, col) in covered:
+                continue
+            cell = sheet._cells.get((row, col))
+            value = font = alignment = None
+            if cell is not None:
+                fill, borders = appearance(cell)
+                value = cell.value if cell.value != '' else None
+                if value is not None:
+                    font = (cell.font.name, cell.font.sz, cell.font.b, cell.font.i, color(cell.font.color))
+                    alignment = (cell.alignment.horizontal, cell.alignment.vertical, cell.alignment.text_rotation)
+            elif row_style is not None and row_style.s:
+                fill, borders = appearance(row_style)
+            elif col in columns and columns[col].style_id:
+                fill, borders = appearance(columns[col])
+            else:
+                fill, borders = None, [None] * 4
+            for cell_range, dxf in rules:
+                if dxf.border is not None and cell_range.min_row <= row <= cell_range.max_row \
+                        and cell_range.min_col <= col <= cell_range.max_col:
+                    for k, name in enumerate(SIDES):
+                        borders[k] = side(dxf.border, name) or borders[k]
+            if value is not None or fill is not None or any(borders):
+                cells[(row, col)] = (value, font, alignment, fill, tuple(borders))
+    return {
+        'cells': cells,
+        'merged': sorted(str(merged) for merged in sheet.merged_cells.ranges),
+        'widths': {col: dimension.width for col, dimension in columns.items()},
+        'zoom': sheet.sheet_view.zoomScale,
+    }
+
+
+def workbook_view(data):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(data))
+    return [(sheet.title, sheet_view(sheet)) for sheet in workbook.worksheets]
+
+
+def differences(reference, candidate):
+    # Lista de diferencias legibles entre dos libros ya leidos con workbook_view
+    found = []
+    if [title for title, _ in reference] != [title for title, _ in candidate]:
+        return [f'sheets {[t for t, _ in reference]} != {[t for t, _ in candidate]}']
+    for (title, expected), (_, actual) in zip(reference, candidate):
+        for key in ('merged', 'widths', 'zoom'):
+            if expected[key] != actual[key]:
+                found.append(f'{title}: {key} differ')
+        for coord in sorted(expected['cells'].keys() | actual['cells'].keys()):
+            if expected['cells'].get(coord) != actual['cells'].get(coord):
+                found.append(f"{title} {coord}: {expected['cells'].get(coord)} != {actual['cells'].get(coord)}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara el xlsx de mainMAX escrito con openpyxl y con el backend stream')
+    parser.add_argument('--tables', type=int, default=4, help='horarios distintos')
+    parser.add_argument('--legs', type=int, default=200)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--horizons', default=','.join(HORIZONS))
+    args = parser.parse_args()
+
+    import pandas as pd
+    import mainMAX
+    from benchmark import synthetic_schedule
+    from fleet import FLEET
+
+    results = []
+    for seed in range(args.tables):
+        table = synthetic_schedule(args.legs, len(FLEET.order), args.days, seed)
+        for horizon in [h for h in args.horizons.split(',') if h]:
+            views = {}
+            for backend in ('openpyxl', 'stream'):
+                excel, error = mainMAX.process_and_plot(pd.DataFrame(table), f'check {seed}', horizon, backend)
+                if error:
+                    raise RuntimeError(f'{backend}: {error}')
+                views[backend] = workbook_view(excel.getvalue())
+            found = differences(views['openpyxl'], views['stream'])
+            cells = sum(len(view['cells']) for _, view in views['openpyxl'])
+            print(f"seed {seed} {horizon:>6}: {len(views['openpyxl'])} sheets, {cells} visible cells, "
+                  f"{len(found)} differences", file=sys.stderr)
+            for line in found[:10]:
+                print(f'    {line}', file=sys.stderr)
+            results.append({'seed': seed, 'horizon': horizon, 'cells': cells, 'differences': len(found)})
+    print(json.dumps(results, indent=2))
+    if any(r['differences'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+import os
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+# Backends para escribir el xlsx de mainMAX. Los dos reciben los mismos llamados (celdas con estilos de
+# styles.py, celdas combinadas, estilos de fila y columna y formato condicional):
+# - 'openpyxl': referencia, un objeto Cell de openpyxl por celda y Workbook.save
+# - 'stream': guarda cada celda como una lista y escribe el SpreadsheetML directo al ZIP, fila por fila
+WRITER_BACKENDS = ('openpyxl', 'stream')
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+SHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Posiciones de cada celda del backend 'stream': [valor, fuente, relleno, borde, alineacion]
+VALUE, FONT, FILL, BORDER, ALIGNMENT = range(5)
+
+
+class OpenpyxlSheet:
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+    @property
+    def title(self):
+        return self.sheet.title
+
+    @title.setter
+    def title(self, value):
+        self.sheet.title = value
+
+    @property
+    def zoom(self):
+        return self.sheet.sheet_view.zoomScale
+
+    @zoom.setter
+    def zoom(self, value):
+        self.sheet.sheet_view.zoomScale = value
+
+    def cell(self, row, column, value=None, font=None, fill=None, border=None, alignment=None):
+        # Como Worksheet.cell: lo que llega en None no se toca
+        cell = self.sheet.cell(row=row, column=column)
+        if value is not None:
+            cell.value = value
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if border is not None:
+            cell.border = border
+        if alignment is not None:
+            cell.alignment = alignment
+
+    def merge(self, min_row, min_col, max_row, max_col):
+        from openpyxl.worksheet.cell_range import CellRange
+        from openpyxl.worksheet.merge import MergedCellRange
+
+        # Como Worksheet.merge_cells, pero el rango va directo al conjunto: merged_cells.add lo busca entre
+        # todos los ya combinados, cuadratico en la cantidad de vuelos. Si no se escribio ninguna celda
+        # cubierta y la inicial no tiene bordes, no hay nada que limpiar ni que copiar a las orillas y se
+        # omiten las MergedCell (como en el backend 'stream')
+        merged = MergedCellRange(self.sheet, CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row).coord)
+        self.sheet.merged_cells.ranges.add(merged)
+        cells = self.sheet._cells
+        covered = any((row, col) in cells for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)
+                      if (row, col) != (min_row, min_col))
+        border = merged.start_cell.border
+        if covered or any(getattr(border, name) is not None and getattr(border, name).style for name in ('top', 'left', 'right', 'bottom')):
+            self.sheet._clean_merge_range(merged)
+
+    def columns(self, min_col, max_col, width, border=None):
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.dimensions import ColumnDimension
+
+        letter = get_column_letter(min_col)
+        self.sheet.column_dimensions[letter] = ColumnDimension(self.sheet, index=letter, width=width, min=min_col, max=max_col)
+        if border is not None:
+            self.sheet.column_dimensions[letter].border = border
+
+    def row_style(self, row, fill=None, border=None):
+        dimension = self.sheet.row_dimensions[row]
+        if fill is not None:
+            dimension.fill = fill
+        if border is not None:
+            dimension.border = border
+
+    def conditional_border(self, ranges, border):
+        from openpyxl.formatting.rule import FormulaRule
+
+        self.sheet.conditional_formatting.add(ranges, FormulaRule(formula=['TRUE'], border=border))
+
+
+class OpenpyxlWriter:
+
+    def __init__(self):
+        import openpyxl
+
+        self.workbook = openpyxl.Workbook()
+        self._fresh = True
+
+    def __setstate__(self, state):
+        # Copias de la cache de marcos y libros que vuelven de los procesos del pool
+        from sheets import rebind_dimensions
+
+        self.__dict__.update(state)
+        rebind_dimensions(self.workbook)
+
+    @property
+    def sheets(self):
+        return [OpenpyxlSheet(sheet) for sheet in self.workbook.worksheets]
+
+    def add_sheet(self, title):
+        # La primera hoja es la hoja vacia que trae el libro nuevo
+        if self._fresh:
+            self._fresh = False
+            sheet = self.workbook.active
+            sheet.title = title
+        else:
+            sheet = self.workbook.create_sheet(title)
+        return OpenpyxlSheet(sheet)
+
+    def adopt(self, other):
+        # Pasa las hojas de otro OpenpyxlWriter al final de este libro
+        from sheets import adopt_sheet
+
+        for sheet in list(other.workbook.worksheets):
+            adopt_sheet(self.workbook, sheet, sheet.title)
+
+    def save(self, fileobj):
+        self.workbook.save(fileobj)
+
+
+_combined_borders = {}
+
+
+def combine_borders(border, other, names):
+    # border + Border(<names> de other), con la suma de openpyxl. Los bordes que llegan son constantes
+    # de styles.py o resultados anteriores de esta funcion, así que se memorizan por identidad: las
+    # mismas combinaciones se repiten en cada vuelo
+    key = (id(border), id(other), names)
+    item = _combined_borders.get(key)
+    if item is None:
+        from openpyxl.styles import Border
+
+        sides = {name: getattr(other, name) for name in names} if other is not None else {}
+        result = (border or Border()) + Border(**sides)
+        if len(_combined_borders) > 4096:
+            _combined_borders.clear()
+        # Se guardan tambien las entradas para que su id no se reutilice mientras viva la llave
+        item = _combined_borders[key] = (border, other, result)
+    return item[2]
+
+
+class StreamSheet:
+
+    def __init__(self, title):
+        self.title = title
+        self.zoom = None
+        self.cells = {}
+        self.merges = []
+        self.column_styles = []
+        self.row_styles = {}
+        self.conditional = []
+
+    def _entry(self, row, column):
+        entry = self.cells.get((row, column))
+        if entry is None:
+            entry = self.cells[(row, column)] = [None, None, None, None, None]
+        return entry
+
+    def cell(self, row, column, value=None, font=None, fill=None, border=None, alignment=None):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        from openpyxl.utils.exceptions import IllegalCharacterError
+
+        entry = self._entry(row, column)
+        if value is not None:
+            if isinstance(value, str) and ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+            entry[VALUE] = value
+        if font is not None:
+            entry[FONT] = font
+        if fill is not None:
+            entry[FILL] = fill
+        if border is not None:
+            entry[BORDER] = border
+        if alignment is not None:
+            entry[ALIGNMENT] = alignment
+
+    def merge(self, min_row, min_col, max_row, max_col):
+        # Igual que openpyxl: la celda inicial toma los bordes derecho e inferior de la celda final, las
+        # celdas cubiertas pierden su contenido y estilo, y los bordes de la celda inicial se copian a
+        # las orillas del rango
+        self.merges.append((min_row, min_col, max_row, max_col))
+        start = self._entry(min_row, min_col)
+        end = self.cells.get((max_row, max_col))
+        if end is not None:
+            start[BORDER] = combine_borders(start[BORDER], end[BORDER], ('right', 'bottom'))
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                if (row, col) != (min_row, min_col):
+                    self.cells.pop((row, col), None)
+        border = start[BORDER]
+        if border is not None:
+            edges = {
+                'top': [(min_row, col) for col in range(min_col, max_col + 1)],
+                'bottom': [(max_row, col) for col in range(min_col, max_col + 1)],
+                'left': [(row, min_col) for row in range(min_row, max_row + 1)],
+                'right': [(row, max_col) for row in range(min_row, max_row + 1)],
+            }
+            for name, coords in edges.items():
+                side = getattr(border, name)
+                if side is None or side.style is None:
+                    continue
+                for row, col in coords:
+                    entry = self._entry(row, col)
+                    entry[BORDER] = combine_borders(entry[BORDER], border, (name,))
+
+    def columns(self, min_col, max_col, width, border=None):
+        self.column_styles.append((min_col, max_col, width, border))
+
+    def row_style(self, row, fill=None, border=None):
+        style = self.row_styles.setdefault(row, [None, None])
+        if fill is not None:
+            style[0] = fill
+        if border is not None:
+            style[1] = border
+
+    def conditional_border(self, ranges, border):
+        self.conditional.append((ranges, border))
+
+
+class StyleTable:
+    # Listas de estilos de styles.xml. Los estilos de styles.py son constantes compartidas: se busca
+    # primero por identidad y solo se compara por contenido la primera vez que aparece cada objeto
+
+    def __init__(self):
+        from openpyxl.styles.borders import DEFAULT_BORDER
+        from openpyxl.styles.fills import DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL
+        from openpyxl.styles.fonts import DEFAULT_FONT
+        from openpyxl.utils.indexed_list import IndexedList
+
+        self.fonts = IndexedList([DEFAULT_FONT])
+        self.fills = IndexedList([DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL])
+        self.borders = IndexedList([DEFAULT_BORDER])
+        self.xfs = IndexedList([(0, 0, 0, None)])
+        self.dxfs = []
+        self._by_id = {}
+        self._keep = []
+
+    def xf(self, font=None, fill=None, border=None, alignment=None):
+        key = (id(font), id(fill), id(border), id(alignment))
+        index = self._by_id.get(key)
+        if index is None:
+            index = self.xfs.add((0 if font is None else self.fonts.add(font),
+                                  0 if fill is None else self.fills.add(fill),
+                                  0 if border is None else self.borders.add(border),
+                                  alignment))
+            self._by_id[key] = index
+            # Los objetos quedan vivos mientras se use la tabla, así su id no se reutiliza
+            self._keep.append((font, fill, border, alignment))
+        return index
+
+    def dxf(self, style):
+        self.dxfs.append(style)
+        return len(self.dxfs) - 1
+
+    def to_xml(self):
+        from openpyxl.xml.functions import tostring
+
+        def block(tag, items):
+            return f'<{tag} count="{len(items)}">' + ''.join(tostring(item.to_tree()).decode('utf-8') for item in items) + f'</{tag}>'
+
+        xfs = []
+        for font, fill, border, alignment in self.xfs:
+            attrs = f'numFmtId="0" fontId="{font}" fillId="{fill}" borderId="{border}" xfId="0"'
+            attrs += ' applyFont="1"' * bool(font) + ' applyFill="1"' * bool(fill) + ' applyBorder="1"' * bool(border)
+            if alignment is None:
+                xfs.append(f'<xf {attrs}/>')
+            else:
+                xfs.append(f'<xf {attrs} applyAlignment="1">{tostring(alignment.to_tree()).decode("utf-8")}</xf>')
+        return (XML_HEADER + f'<styleSheet xmlns="{MAIN_NS}">'
+                + block('fonts', self.fonts) + block('fills', self.fills) + block('borders', self.borders)
+                + '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                + f'<cellXfs count="{len(xfs)}">' + ''.join(xfs) + '</cellXfs>'
+                + '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                + block('dxfs', self.dxfs)
+                + '<tableStyles count="0" defaultTableStyle="TableStyleMedium9" defaultPivotStyle="PivotStyleLight16"/>'
+                + '</styleSheet>')
+
+
+def cell_xml(ref, entry, style):
+    value = entry[VALUE]
+    attrs = f'r="{ref}"' + (f' s="{style}"' if style else '')
+    if value is None or value == '':
+        return f'<c {attrs}/>'
+    if isinstance(value, str):
+        space = ' xml:space="preserve"' if value != value.strip() else ''
+        return f'<c {attrs} t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c {attrs} t="b"><v>{int(value)}</v></c>'
+    from openpyxl.compat import safe_string
+
+    return f'<c {attrs} t="n"><v>{safe_string(value)}</v></c>'
+
+
+def write_sheet_xml(out, sheet, styles, selected):
+    # Los elementos van en el orden que exige el esquema de SpreadsheetML
+    from openpyxl.styles.differential import DifferentialStyle
+    from openpyxl.utils import get_column_letter
+
+    view = ' tabSelected="1"' if selected else ''
+    if sheet.zoom:
+        view += f' zoomScale="{sheet.zoom}"'
+    out.write((XML_HEADER + f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+               + f'<sheetViews><sheetView{view} workbookViewId="0">'
+               + '<selection activeCell="A1" sqref="A1"/></sheetView></sheetViews>'
+               + '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>').encode('utf-8'))
+    if sheet.column_styles:
+        cols = []
+        for min_col, max_col, width, border in sorted(sheet.column_styles, key=lambda item: item[0]):
+            style = f' style="{styles.xf(border=border)}"' if border is not None else ''
+            cols.append(f'<col min="{min_col}" max="{max_col}" width="{width}" customWidth="1"{style}/>')
+        out.write(('<cols>' + ''.join(cols) + '</cols>').encode('utf-8'))
+
+    rows = {}
+    for (row, col), entry in sheet.cells.items():
+        rows.setdefault(row, []).append((col, entry))
+    letters = {}
+    out.write(b'<sheetData>')
+    for row in sorted(rows.keys() | sheet.row_styles.keys()):
+        parts = []
+        row_style = sheet.row_styles.get(row)
+        if row_style is not None:
+            parts.append(f'<row r="{row}" s="{styles.xf(fill=row_style[0], border=row_style[1])}" customFormat="1">')
+        else:
+            parts.append(f'<row r="{row}">')
+        for col, entry in sorted(rows.get(row, ()), key=lambda item: item[0]):
+            style = styles.xf(entry[FONT], entry[FILL], entry[BORDER], entry[ALIGNMENT])
+            if not style and entry[VALUE] is None:
+                continue
+            letter = letters.get(col)
+            if letter is None:
+                letter = letters[col] = get_column_letter(col)
+            parts.append(cell_xml(f'{letter}{row}', entry, style))
+        parts.append('</row>')
+        out.write(''.join(parts).encode('utf-8'))
+    out.write(b'</sheetData>')
+
+    if sheet.merges:
+        refs = [f'<mergeCell ref="{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"/>'
+                for min_row, min_col, max_row, max_col in sheet.merges]
+        out.write((f'<mergeCells count="{len(refs)}">' + ''.join(refs) + '</mergeCells>').encode('utf-8'))
+    for priority, (ranges, border) in enumerate(sheet.conditional, 1):
+        dxf = styles.dxf(DifferentialStyle(border=border))
+        out.write((f'<conditionalFormatting sqref={quoteattr(ranges)}><cfRule type="expression" dxfId="{dxf}" '
+                   f'priority="{priority}"><formula>TRUE</formula></cfRule></conditionalFormatting>').encode('utf-8'))
+    out.write(b'<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/></worksheet>')
+
+
+class StreamWriter:
+
+    def __init__(self):
+        self.sheets = []
+
+    def add_sheet(self, title):
+        sheet = StreamSheet(title)
+        self.sheets.append(sheet)
+        return sheet
+
+    def adopt(self, other):
+        # Las celdas guardan los objetos de estilo, así que basta con mover las hojas
+        self.sheets.extend(other.sheets)
+
+    def save(self, fileobj):
+        # Cada hoja se comprime a medida que se genera; styles.xml va al final, cuando ya se conocen
+        # todas las combinaciones de estilo
+        styles = StyleTable()
+        count = len(self.sheets)
+        with zipfile.ZipFile(fileobj, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', XML_HEADER
+                             + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                             + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                             + '<Default Extension="xml" ContentType="application/xml"/>'
+                             + '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                             + '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                             + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{SHEET_TYPE}"/>'
+                                       for i in range(1, count + 1))
+                             + '</Types>')
+            archive.writestr('_rels/.rels', XML_HEADER + f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+                             + f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                             + '</Relationships>')
+            archive.writestr('xl/workbook.xml', XML_HEADER + f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+                             + '<bookViews><workbookView activeTab="0"/></bookViews><sheets>'
+                             + ''.join(f'<sheet name={quoteattr(sheet.title)} sheetId="{i}" r:id="rId{i}"/>'
+                                       for i, sheet in enumerate(self.sheets, 1))
+                             + '</sheets></workbook>')
+            archive.writestr('xl/_rels/workbook.xml.rels', XML_HEADER + f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+                             + ''.join(f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                                       for i in range(1, count + 1))
+                             + f'<Relationship Id="rId{count + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+                             + '</Relationships>')
+            for i, sheet in enumerate(self.sheets, 1):
+                with archive.open(f'xl/worksheets/sheet{i}.xml', mode='w') as out:
+                    write_sheet_xml(out, sheet, styles, selected=i == 1)
+            archive.writestr('xl/styles.xml', styles.to_xml())
+
+
+def new_writer(backend):
+    return StreamWriter() if backend == 'stream' else OpenpyxlWriter()
+
+
+def writer_backend_from_env():
+    return os.environ.get('XLSX_WRITER', 'openpyxl')